@@ -77,6 +77,15 @@ class Binner(ABC):
         Return the bins after the addition.
         """
         return bins
+
+    def add_items_to_bin(self, bins:BinsArray, items: List[Any], bin_index: int)->BinsArray:
+        """
+        Add the given items, in order, to the given bin in the given array.
+        Return the bins after the addition.
+        """
+        for item in items:
+            self.add_item_to_bin(bins, item, bin_index)
+        return bins
         
     def remove_item_from_bin(self, bins:BinsArray, bin_index: int, item_index: int)->BinsArray:
         sums, lists = bins
@@ -124,6 +133,16 @@ class Binner(ABC):
         """
         pass
 
+    def combine_bins_in_reverse_order(self, bins1:BinsArray, bins2:BinsArray):
+        """
+        Combine bin i at array bins1 with bin numbins-1-i at array bins2, for all i.
+        This is the main step of the multiway Karmarkar-Karp algorithm (when both arrays are sorted by ascending sum).
+        NOTE: bins1 is modified; bins2 is not.
+        """
+        numbins = self.numbins(bins1)
+        for ibin in range(numbins):
+            self.combine_bins(bins1, ibin, bins2, numbins-ibin-1)
+
     @abstractmethod
     def all_combinations(self, bins1: BinsArray, bins2: BinsArray)->Iterator[BinsArray]:
         '''
@@ -170,6 +189,10 @@ class BinnerKeepingSums(Binner):
     Bin #0: sum=3.0
     Bin #1: sum=9.0
     Bin #2: sum=5.0
+    >>> printbins(binner.add_items_to_bin(binner.copy_bins(bins), items=["a", "d"], bin_index=0))
+    Bin #0: sum=11.0
+    Bin #1: sum=9.0
+    Bin #2: sum=0.0
     >>> binner.sort_by_ascending_sum(bins)
     >>> printbins(bins)
     Bin #0: sum=0.0
@@ -219,6 +242,11 @@ class BinnerKeepingSums(Binner):
         bins[bin_index] += self.valueof(item)
         return bins
 
+    def add_items_to_bin(self, bins: BinsArray, items: List[Any], bin_index: int)->BinsArray:
+        # summing in Python, starting from the current sum, adds the values in the same order as add_item_to_bin.
+        bins[bin_index] = sum(map(self.valueof, items), float(bins[bin_index]))
+        return bins
+
     def numitems(self, bins: BinsArray, bin_index:int) -> Tuple[float]:
         raise NotImplementedError("Bins keeping sums do not keep track of the number of items.")
 
@@ -237,6 +265,16 @@ class BinnerKeepingSums(Binner):
     def combine_bins(self, bins1:BinsArray, ibin1:int, bins2:BinsArray, ibin2:int):
         bins1[ibin1] += bins2[ibin2]
 
+    def combine_bins_in_reverse_order(self, bins1:BinsArray, bins2:BinsArray):
+        """
+        >>> binner = BinnerKeepingSums()
+        >>> bins1 = np.array([1., 2., 3.])
+        >>> binner.combine_bins_in_reverse_order(bins1, np.array([4., 5., 6.]))
+        >>> bins1
+        array([7., 7., 7.])
+        """
+        bins1 += bins2[::-1]
+
     def all_combinations(self, bins1: BinsArray, bins2: BinsArray)->Iterator[BinsArray]:
         """
         >>> binner = BinnerKeepingSums()
@@ -307,6 +345,10 @@ class BinnerKeepingContents(BinnerKeepingSums):
     Bin #0: ['a'], sum=3.0
     Bin #1: ['b', 'c'], sum=9.0
     Bin #2: ['e'], sum=5.0
+    >>> printbins(binner.add_items_to_bin(binner.copy_bins(bins), items=["a", "d"], bin_index=0))
+    Bin #0: ['a', 'a', 'd'], sum=11.0
+    Bin #1: ['b', 'c'], sum=9.0
+    Bin #2: [], sum=0.0
     >>> binner.sort_by_ascending_sum(bins)
     >>> printbins(bins)
     Bin #0: [], sum=0.0
@@ -375,6 +417,13 @@ class BinnerKeepingContents(BinnerKeepingSums):
         lists[bin_index].append(item)
         return bins
 
+    def add_items_to_bin(self, bins:BinsArray, items: List[Any], bin_index: int)->BinsArray:
+        sums, lists = bins
+        items = list(items)
+        sums[bin_index] = sum(map(self.valueof, items), float(sums[bin_index]))
+        lists[bin_index].extend(items)
+        return bins
+
     def sums(self, bins: BinsArray) -> Tuple[float]:
         return bins[0]
 
@@ -392,11 +441,29 @@ class BinnerKeepingContents(BinnerKeepingSums):
         return len(bins[0])
 
     def sort_by_ascending_sum(self, bins: BinsArray) -> BinsArray:
+        """
+        >>> binner = BinnerKeepingContents()
+        >>> bins = (np.array([5., 2.]), [[5], [2]])
+        >>> binner.sort_by_ascending_sum(bins)
+        >>> printbins(bins)
+        Bin #0: [2], sum=2.0
+        Bin #1: [5], sum=5.0
+        >>> bins = (np.array([5., 2., 3.]), [[5], [2], [3]])
+        >>> binner.sort_by_ascending_sum(bins)
+        >>> printbins(bins)
+        Bin #0: [2], sum=2.0
+        Bin #1: [3], sum=3.0
+        Bin #2: [5], sum=5.0
+        """
         sums, lists = bins
-        numbins = self.numbins(bins)
-        sorted_indices = sorted(range(numbins), key=lambda i: sums[i])
-        sums[:] = list(map(sums.__getitem__, sorted_indices))
-        lists[:] = list(map(lists.__getitem__, sorted_indices))
+        if len(lists) == 2:   # the common two-way case: a swap is much faster than argsort.
+            if sums[0] > sums[1]:
+                sums[0], sums[1] = sums[1], sums[0]
+                lists[0], lists[1] = lists[1], lists[0]
+            return
+        sorted_indices = np.argsort(sums, kind="stable")   # stable, like Python's sorted.
+        sums[:] = np.asarray(sums)[sorted_indices]
+        lists[:] = [lists[i] for i in sorted_indices]
         # return bins
 
     def combine_bins(self, bins1:BinsArray, ibin1:int, bins2:BinsArray, ibin2:int):
@@ -405,6 +472,21 @@ class BinnerKeepingContents(BinnerKeepingSums):
         sums1[ibin1] += sums2[ibin2]
         lists1[ibin1] += lists2[ibin2]
 
+    def combine_bins_in_reverse_order(self, bins1:BinsArray, bins2:BinsArray):
+        """
+        >>> binner = BinnerKeepingContents()
+        >>> bins1 = (np.array([1., 20.]), [[1], [20]])
+        >>> binner.combine_bins_in_reverse_order(bins1, (np.array([4., 50.]), [[4], [46, 4]]))
+        >>> printbins(bins1)
+        Bin #0: [1, 46, 4], sum=51.0
+        Bin #1: [20, 4], sum=24.0
+        """
+        sums1, lists1 = bins1
+        sums2, lists2 = bins2
+        sums1 += sums2[::-1]
+        for list1, list2 in zip(lists1, reversed(lists2)):
+            list1 += list2
+
     def all_combinations(self, bins1: BinsArray, bins2: BinsArray)->Iterator[BinsArray]:
         """
         >>> binner = BinnerKeepingContents()
@@ -11,39 +11,23 @@ subsets that exclude the first number
 """
 
 from typing import List, Generator, Callable
-
-
-class Node:
-    def __init__(self,depth, cur_set, remaining_numbers):
-        self.depth = depth
-        self.cur_set = cur_set
-        self.remaining_numbers = remaining_numbers
-        self.left = None
-        self.right = None
+from math import inf
 
 
 class InExclusionBinTree:
 
     def __init__(self, items: List, valueof: Callable, upper_bound, lower_bound):
         self.items = sorted(items, key=valueof, reverse=True)
-        self.leaf_depth = len(items)
-        self.root = Node(0, [], self.items)  # root
+        self.values = [valueof(item) for item in self.items]
+        # suffix_sums[d] is the sum of values of the items from depth d onwards, i.e., of the remaining numbers of a node at depth d.
+        self.suffix_sums = [0] * (len(self.items) + 1)
+        for depth in range(len(self.items) - 1, -1, -1):
+            self.suffix_sums[depth] = self.suffix_sums[depth + 1] + self.values[depth]
+        self.leaf_depth = len(self.items)
         self.valueof = valueof
         self.upper_bound = upper_bound
         self.lower_bound = lower_bound
 
-    # inclusion
-    def add_right(self, parent: Node):
-        parent.right = Node(depth=parent.depth+1,
-                            cur_set=parent.cur_set + [parent.remaining_numbers[0]],
-                            remaining_numbers=parent.remaining_numbers[1:])
-
-    # exclusion
-    def add_left(self, parent: Node):
-        parent.left = Node(depth=parent.depth+1,
-                           cur_set=parent.cur_set,
-                           remaining_numbers=parent.remaining_numbers[1:])
-
     def generate_tree(self) -> Generator:
         """
         >>> items = {"a": 1, "b": 2, "c": 3, "d": 3, "e": 5, "f": 9, "g": 9}
@@ -74,24 +58,59 @@ class InExclusionBinTree:
         [6, 4]
         [5, 4]
         """
-        current_node = self.root
-        return self.rec_generate_tree(current_node)
-
-    def rec_generate_tree(self, current_node: Node) -> Generator:
-        # prune
-        if sum(map(self.valueof,current_node.cur_set)) > self.upper_bound or \
-                sum(map(self.valueof,current_node.cur_set + current_node.remaining_numbers)) < self.lower_bound:
-            return
-        # generate
-        if current_node.depth == self.leaf_depth:
-            yield current_node.cur_set
-            return
-
-        self.add_right(current_node)
-        yield from self.rec_generate_tree(current_node.right)
-
-        self.add_left(current_node)
-        yield from self.rec_generate_tree(current_node.left)
+        # Depth-first search with an explicit stack of nodes (depth, cur_set, cur_sum), where cur_sum is the sum of values in cur_set.
+        # The bounds are checked when a node is visited, since the caller may tighten them during the iteration.
+        stack = [(0, [], 0)]
+        while stack:
+            depth, cur_set, cur_sum = stack.pop()
+            # prune
+            if cur_sum > self.upper_bound or cur_sum + self.suffix_sums[depth] < self.lower_bound:
+                continue
+            # generate
+            if depth == self.leaf_depth:
+                yield cur_set
+                continue
+            stack.append((depth + 1, cur_set, cur_sum))   # exclusion - popped after the whole inclusion subtree
+            stack.append((depth + 1, cur_set + [self.items[depth]], cur_sum + self.values[depth]))   # inclusion
+
+    def generate_tree_with_remaining(self) -> Generator:
+        """
+        Like generate_tree, but yields each bounded set together with the remaining items (the items not in the set).
+        Each bounded set is a subsequence of the sorted items, so the remaining items are found in a single pass, without counting.
+
+        >>> t = InExclusionBinTree([4,5,6,7,8], lambda x: x, upper_bound=10, lower_bound=7)
+        >>> for bounded_set, remaining_items in t.generate_tree_with_remaining(): bounded_set, remaining_items
+        ([8], [7, 6, 5, 4])
+        ([7], [8, 6, 5, 4])
+        ([6, 4], [8, 7, 5])
+        ([5, 4], [8, 7, 6])
+        >>> t = InExclusionBinTree([5,5,1], lambda x: x, upper_bound=6, lower_bound=6)
+        >>> for bounded_set, remaining_items in t.generate_tree_with_remaining(): bounded_set, remaining_items
+        ([5, 1], [5])
+        ([5, 1], [5])
+        """
+        for bounded_set in self.generate_tree():
+            remaining_items = []
+            ibounded = 0
+            for item in self.items:
+                if ibounded < len(bounded_set) and bounded_set[ibounded] == item:
+                    ibounded += 1
+                else:
+                    remaining_items.append(item)
+            yield bounded_set, remaining_items
+
+
+def combined_difference(sums1, sums2) -> float:
+    """
+    The difference between the largest and smallest sum in both arrays, without concatenating them.
+    sums2 may be empty (e.g. when there are no prior bins).
+
+    >>> combined_difference([3., 5.], [4., 9.])
+    6.0
+    >>> combined_difference([3., 5.], [])
+    2.0
+    """
+    return max(max(sums1), max(sums2, default=-inf)) - min(min(sums1), min(sums2, default=inf))
 
 
 if __name__ == '__main__':
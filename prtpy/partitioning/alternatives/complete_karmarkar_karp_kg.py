@@ -110,10 +110,9 @@ def ckk_heuristic(items: List[any], k: int = 2):
     """
     stack = [[]]
     heap_count = count()
+    empty: List[int] = []   # shared by all initial partitions; safe since subsets are only combined into new lists, never mutated.
     for number in items:
-        l: List[List[int]] = [[] for _ in range(k - 1)]
-        r: List[List[int]] = [[number]]
-        this_partition = l + r
+        this_partition: List[List[int]] = [empty] * (k - 1) + [[number]]
         this_sizes: List[int] = [0] * (k - 1) + [number]
         heapq.heappush(stack[0], (-number, next(heap_count), this_partition, this_sizes))
     best = -np.inf
@@ -12,12 +12,12 @@
     Email: kfir.goldfarb@msmail.ariel.ac.il
 """
 import itertools
+import numpy as np
 from typing import Callable, List
 from prtpy import Bins
 from prtpy.alternatives.bins import BinsKeepingContents
 from prtpy.partitioning.alternatives.recursive_number_partitioning_kg import rnp
-from prtpy.partitioning.alternatives.utils import is_all_lists_are_different, all_in, get_best_best_k_combination, \
-    get_sum_of_max_subset, get_largest_number
+from prtpy.partitioning.alternatives.utils import all_in, disjoint_combinations
 from prtpy.partitioning.alternatives.trivial import trivial_partition
 
 
@@ -78,27 +78,24 @@ def irnp(bins: Bins, items: List[any], valueof: Callable = lambda x: x):
 
     items.sort(reverse=True, key=valueof)
 
-    all_combinations = []
-    for i in range(1, len(items) - bins.num + 2):
-        all_combinations.extend([list(combination) for combination in itertools.combinations(items, i)])
+    # The subsets are kept as the tuples generated by itertools; they are never modified, so there is no need to copy them into lists.
+    all_combinations = list(itertools.chain.from_iterable(
+        itertools.combinations(items, i) for i in range(1, len(items) - bins.num + 2)))
 
-    flag = False
     best_k_combination = []
-    all_k_combinations = []
-    for combination in itertools.combinations(all_combinations, bins.num):
-        if is_all_lists_are_different(combination) and all_in(combination, items):
-            all_k_combinations.append(list(combination))
-
+    best_diff = np.inf
+    for combination in disjoint_combinations(all_combinations, bins.num):
+        if all_in(combination, items):
+            diff, max_subset_sum, largest_number = _combination_stats(combination)
             # found a optimal partition or maximum subset sum equals to largest number
-            if _calculate_diff(combination) == 0 or get_sum_of_max_subset(combination) == get_largest_number(
-                    combination):
+            if diff == 0 or max_subset_sum == largest_number:
                 best_k_combination = combination
-                flag = True
                 break
 
-    # working as irnp by taking the not optimal k combination
-    if not flag:
-        best_k_combination = get_best_best_k_combination(k_combinations=all_k_combinations)
+            # otherwise, working as irnp by keeping the best (not optimal) k combination seen so far
+            if diff < best_diff:
+                best_diff = diff
+                best_k_combination = combination
 
     # add solution to bins
     for index, combination_items in enumerate(best_k_combination):
@@ -107,6 +104,25 @@ def irnp(bins: Bins, items: List[any], valueof: Callable = lambda x: x):
     return bins
 
 
+def _combination_stats(combination):
+    """
+    Returns the values of _calculate_diff, get_sum_of_max_subset and get_largest_number for the given combination of non-empty subsets,
+    in a single pass that computes each subset sum once.
+
+    >>> _combination_stats(([8], [7, 4], [6, 5]))
+    (6, 11, 8)
+
+    >>> _combination_stats(([95, 5], [85, 15], [75, 25]))
+    (0, 100, 95)
+    """
+    sums = [sum(subset) for subset in combination]
+    diff = sum(abs(sum0 - sum1) for sum0, sum1 in itertools.combinations(sums, 2))
+    largest_sum = max(sums)
+    max_subset_sum = largest_sum if largest_sum > 0 else sums[0]
+    largest_number = max(0, max(max(subset) for subset in combination))
+    return diff, max_subset_sum, largest_number
+
+
 def _calculate_diff(items):
     """
     This function get list of lists and return the different sum error between all the sub-lists
@@ -142,12 +158,13 @@ def _calculate_diff(items):
     0
 
     """
+    sums = [sum(subset) if len(subset) > 0 else None for subset in items]   # each sum is computed once, not once per pair.
     diff_sum = 0
-    for combination in itertools.combinations(items, 2):
-        if len(combination[0]) == 0 or len(combination[1]) == 0:
+    for sum0, sum1 in itertools.combinations(sums, 2):
+        if sum0 is None or sum1 is None:
             break
         else:
-            diff_sum += abs(sum(combination[0]) - sum(combination[1]))
+            diff_sum += abs(sum0 - sum1)
     return diff_sum
 
 
@@ -19,6 +19,7 @@
     Date: 26/04/2022
     Email: kfir.goldfarb@msmail.ariel.ac.il
 """
+import heapq
 from typing import Callable, List
 from prtpy import Bins, BinsKeepingContents
 from prtpy.partitioning.alternatives.trivial import trivial_partition
@@ -62,28 +63,31 @@ def kk(bins: Bins, items: List[any], valueof: Callable = lambda x: x):
 
     items = sorted(items, key=valueof, reverse=True)
 
-    difference_sets = kk_heuristic(items, valueof=valueof)
+    trace = kk_heuristic(items, valueof=valueof)
 
     A, B = [], []
-
-    while len(difference_sets) > 0:
-        difference_set = difference_sets[0]
-        while len(difference_set) > 0:
-            integer = max(difference_set)
-            if integer not in A and integer not in B:
-                if sum(A) < sum(B):
-                    A.append(integer)
-                else:
-                    B.append(integer)
-            difference_set.remove(integer)
-        difference_sets.remove(difference_set)
-
-    if sum(A) > sum(B):
-        [bins.add_item_to_bin(item=i, bin_index=0) for i in A if i in items]
-        [bins.add_item_to_bin(item=i, bin_index=1) for i in B if i in items]
+    A_set, B_set = set(), set()   # for fast membership tests; A and B keep the order.
+    sum_A, sum_B = 0, 0
+
+    # The items come first in the trace, so they are sorted; every difference after them is a single new number.
+    for integer in sorted(trace[:len(items)], reverse=True) + trace[len(items):]:
+        if integer not in A_set and integer not in B_set:
+            if sum_A < sum_B:
+                A.append(integer)
+                A_set.add(integer)
+                sum_A += integer
+            else:
+                B.append(integer)
+                B_set.add(integer)
+                sum_B += integer
+
+    items_set = set(items)
+    if sum_A > sum_B:
+        [bins.add_item_to_bin(item=i, bin_index=0) for i in A if i in items_set]
+        [bins.add_item_to_bin(item=i, bin_index=1) for i in B if i in items_set]
     else:
-        [bins.add_item_to_bin(item=i, bin_index=0) for i in B if i in items]
-        [bins.add_item_to_bin(item=i, bin_index=1) for i in A if i in items]
+        [bins.add_item_to_bin(item=i, bin_index=0) for i in B if i in items_set]
+        [bins.add_item_to_bin(item=i, bin_index=1) for i in A if i in items_set]
 
     return bins
 
@@ -96,29 +100,29 @@ def kk_heuristic(items: List[any], valueof: Callable = lambda x: x):
         1. Take the two largest numbers in S, remove them from S, and insert their difference (this represents a decision to put each of these numbers in a different subset).
         2. Proceed in this way until a single number remains. This single number is the difference in sums between the two subsets.
 
+    Returns a trace: the items, followed by the (positive) difference inserted in each step.
+    This is all that kk needs, since every other number in S at a step was already in S at an earlier step.
+
     >>> kk_heuristic(items=[1, 2])
-    [[1, 2], [1]]
+    [1, 2, 1]
 
-    >>> kk_heuristic(items=[4, 5, 6, 7, 8])
-    [[4, 5, 6, 7, 8], [6, 5, 4, 1], [4, 1, 1], [3, 1], [2]]
+    >>> kk_heuristic(items=[8, 7, 6, 5, 4])
+    [8, 7, 6, 5, 4, 1, 1, 3, 2]
 
-    >>> kk_heuristic(items=[1, 2, 3, 4, 5, 6])
-    [[1, 2, 3, 4, 5, 6], [4, 3, 2, 1, 1], [2, 1, 1, 1], [1, 1, 1], [1]]
+    >>> kk_heuristic(items=[6, 5, 4, 3, 2, 1])
+    [6, 5, 4, 3, 2, 1, 1, 1, 1]
     """
-    difference_sets = []
-    difference_sets.append(list(items))
-    input_items = list(items)
-    input_items.sort(reverse=True, key=valueof)
-    while len(input_items) > 1:
-        max_a = input_items.pop(0)
-        max_b = input_items.pop(0)
+    trace = list(items)
+    heap = [-valueof(item) for item in items]   # a max-heap, so that each step takes O(log n) instead of a full sort.
+    heapq.heapify(heap)
+    while len(heap) > 1:
+        max_a = -heapq.heappop(heap)
+        max_b = -heapq.heappop(heap)
         diff = abs(max_a - max_b)
         if diff > 0:
-            input_items.append(diff)
-        input_items.sort(reverse=True, key=valueof)
-        difference_sets.append(list(input_items))
-    return difference_sets
-
+            heapq.heappush(heap, -diff)
+            trace.append(diff)
+    return trace
 
 if __name__ == "__main__":
     import doctest
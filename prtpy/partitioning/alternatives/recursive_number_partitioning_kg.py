@@ -20,7 +20,7 @@ from typing import Callable, List
 
 from prtpy import Bins, BinsKeepingContents
 from prtpy.partitioning.alternatives.complete_karmarkar_karp_kg import optimal
-from prtpy.partitioning.alternatives.utils import all_in, is_all_lists_are_different, get_best_best_k_combination
+from prtpy.partitioning.alternatives.utils import all_in, disjoint_combinations, get_best_best_k_combination
 from prtpy.partitioning.alternatives.trivial import trivial_partition
 
 
@@ -68,11 +68,10 @@ def rnp(bins: Bins, items: List[any], valueof: Callable = lambda x: x):
 
     items = sorted(items, reverse=True, key=valueof)
 
-    all_combinations = []
-    for i in range(1, len(items) - bins.num + 2):
-        all_combinations.extend([list(combination) for combination in itertools.combinations(items, i)])
-    all_k_combinations = [list(combination) for combination in itertools.combinations(all_combinations, bins.num) if
-                          is_all_lists_are_different(combination) and all_in(combination, items)]
+    all_combinations = list(itertools.chain.from_iterable(
+        itertools.combinations(items, i) for i in range(1, len(items) - bins.num + 2)))
+    # Overlapping k-combinations are pruned while they are generated, and the rest are streamed without being stored.
+    all_k_combinations = (combination for combination in disjoint_combinations(all_combinations, bins.num) if all_in(combination, items))
     best_k_combination = get_best_best_k_combination(k_combinations=all_k_combinations)
 
     for index, combination_items in enumerate(best_k_combination):
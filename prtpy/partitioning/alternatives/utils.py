@@ -1,5 +1,5 @@
 import itertools
-from copy import deepcopy
+from typing import List
 import numpy as np
 import random  # for the doctests
 
@@ -33,13 +33,14 @@ def get_best_best_k_combination(k_combinations):
     flag = True
     for k_combination in k_combinations:
         diff_sum = 0
-        for combinations in itertools.combinations(k_combination, 2):
-            if len(combinations[0]) == 0 or len(combinations[1]) == 0:
+        sums = [sum(subset) if len(subset) > 0 else None for subset in k_combination]   # each sum is computed once, not once per pair.
+        for sum0, sum1 in itertools.combinations(sums, 2):
+            if sum0 is None or sum1 is None:
                 flag = False
                 break
             else:
                 flag = True
-            diff_sum += abs(sum(combinations[0]) - sum(combinations[1]))
+            diff_sum += abs(sum0 - sum1)
         if flag and diff_sum < minimum_diff:
             minimum_diff = diff_sum
             best_combination = k_combination
@@ -129,7 +130,7 @@ def all_in(sub_items: list, items) -> bool:
     False
 
     """
-    copy_items = deepcopy(items)
+    copy_items = list(items)   # a shallow copy is enough, since items are only removed from it.
     for items in sub_items:
         for item in items:
             copy_items.remove(item)
@@ -183,6 +184,25 @@ def is_all_lists_are_different(list_of_lists) -> bool:
     return flag
 
 
+def disjoint_combinations(subsets: List[list], k: int, start: int = 0, chosen: tuple = (), chosen_values: frozenset = frozenset()):
+    """
+    Generate the k-combinations of the given subsets, in which all subsets have different items,
+    in the same order as itertools.combinations(subsets, k).
+    A branch is pruned as soon as a chosen subset shares an item with a previously chosen one,
+    instead of generating all k-combinations and filtering them afterwards.
+
+    >>> list(disjoint_combinations([[1], [2], [3], [1, 2]], 2))
+    [([1], [2]), ([1], [3]), ([2], [3]), ([3], [1, 2])]
+    """
+    if len(chosen) == k:
+        yield chosen
+        return
+    for index in range(start, len(subsets) - (k - len(chosen)) + 1):
+        subset = subsets[index]
+        if chosen_values.isdisjoint(subset):
+            yield from disjoint_combinations(subsets, k, index + 1, chosen + (subset,), chosen_values.union(subset))
+
+
 if __name__ == "__main__":
     import doctest
     (failures, tests) = doctest.testmod(report=True)
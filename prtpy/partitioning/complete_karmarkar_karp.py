@@ -81,9 +81,7 @@ def optimal(binner: Binner, numbins: int, items: List[any]) -> BinsArray:
 
     stack = []  #: List[List[Tuple[int, int, Bins, List[int]]]]
     first_heap = BinsSortedByMaxDiff(binner)
-    for item in items:
-        new_bins = binner.add_item_to_bin(binner.new_bins(numbins), item=item, bin_index=numbins-1)
-        first_heap.push(new_bins)
+    first_heap.push_singletons(items, numbins)
     stack.append(first_heap)
 
     best_difference_so_far = -np.inf  # maybe insert here upper bound constraint : best = upper
@@ -133,12 +131,19 @@ def generator(
     best:  negative upper bound on the difference.
             -np.inf (default): yield better partitions than the one found so far.
            other: yield partitions with upper bound "best" on the difference.
+    The caller may tighten the bound while iterating, by sending a new (negative) bound to the generator instead of calling next.
 
     >>> from prtpy import partition, BinnerKeepingContents, BinnerKeepingSums
     >>> for part in generator(BinnerKeepingSums(), 4, items=[1,2,3,3,5,9,9]): part
     [7.0, 7.0, 9.0, 9.0]
     >>> for part in generator(BinnerKeepingContents(), 4, items=[1, 3, 3, 4, 4, 5, 5, 5]): part
     ([6.0, 8.0, 8.0, 8.0], [[1, 5], [4, 4], [3, 5], [3, 5]])
+
+    >>> parts = generator(BinnerKeepingSums(), 2, items=[8, 7, 6, 5, 4], best_difference_so_far=-5)
+    >>> list(next(parts))
+    [14.0, 16.0]
+    >>> list(parts.send(-2))   # partitions with difference 2 or more are no longer wanted.
+    [15.0, 15.0]
     """
     numitems = len(items)
     logger.info("\nComplete-Karmarkar-Karp Partitioning of %d items into %d parts.", numitems, numbins)
@@ -146,9 +151,7 @@ def generator(
 
     stack = []  #: List[List[Tuple[int, int, Bins, List[int]]]]
     first_heap = BinsSortedByMaxDiff(binner)
-    for item in items:
-        new_bins = binner.add_item_to_bin(binner.new_bins(numbins), item=item, bin_index=numbins-1)
-        first_heap.push(new_bins)
+    first_heap.push_singletons(items, numbins)
     stack.append(first_heap)
 
     logger.info(f"we create the stack - all stack items are possibles branches in the tree (we then combine them in all possible ways). "
@@ -182,7 +185,9 @@ def generator(
                 if isBest:
                     best_difference_so_far = diff
                 best_partition_so_far =  current_heap.top()
-                yield best_partition_so_far
+                new_bound = yield best_partition_so_far
+                if new_bound is not None and new_bound > best_difference_so_far:
+                    best_difference_so_far = new_bound   # the caller found a better bound elsewhere (see rnp).
                 if diff == 0:
                     logger.info("Perfect partition is found!!!")
                     return
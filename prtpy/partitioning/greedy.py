@@ -32,8 +32,24 @@ def greedy(binner: Binner, numbins: int, items: List[any]):
     [['f', 'b'], ['g', 'a'], ['e', 'c', 'd']]
     >>> partition(algorithm=greedy, numbins=2, items={"a":1, "b":2, "c":3, "d":3, "e":5, "f":9, "g":9}, outputtype=out.Sums)
     [16.0, 16.0]
+
+    Trivial cases are handled without the main loop:
+    >>> printbins(greedy(BinnerKeepingContents(), 1, items=[1,2,3]))
+    Bin #0: [1, 2, 3], sum=6.0
+    >>> printbins(greedy(BinnerKeepingContents(), 3, items=[1,2]))
+    Bin #0: [2], sum=2.0
+    Bin #1: [1], sum=1.0
+    Bin #2: [], sum=0.0
     """
     bins = binner.new_bins(numbins)
+    if numbins == 1:   # all items go to the single bin - no need to sort.
+        for item in items:
+            binner.add_item_to_bin(bins, item, 0)
+        return bins
+    if len(items) <= numbins:   # each item gets its own bin.
+        for ibin, item in enumerate(sorted(items, key=binner.valueof, reverse=True)):
+            binner.add_item_to_bin(bins, item, ibin)
+        return bins
     for item in sorted(items, key=binner.valueof, reverse=True):
         index_of_least_full_bin = min(range(numbins), key=binner.sums(bins).__getitem__)
         binner.add_item_to_bin(bins, item, index_of_least_full_bin)
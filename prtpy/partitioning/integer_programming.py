@@ -9,24 +9,115 @@ Credit: Rob Pratt, https://or.stackexchange.com/a/6115/2576
 
 from typing import List, Callable, Any
 from numbers import Number
-from prtpy import objectives as obj, outputtypes as out, Binner, printbins
+from prtpy import objectives as obj, outputtypes as out, Binner, BinnerKeepingContents, printbins
+from prtpy.partitioning.greedy import greedy
+from prtpy.partitioning.karmarkar_karp import kk
 from math import inf
+import numpy as np
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
 
 import mip
+import importlib.util
+
+
+def _pick_default_solver()->str:
+    """
+    Return the fastest MIP solver that python-mip can use on this machine:
+    Gurobi if its library is installed, then HiGHS (supported by newer versions of python-mip), then CBC (bundled with python-mip).
+    """
+    try:
+        import mip.gurobi
+        if mip.gurobi.found:
+            return mip.GRB
+    except Exception:
+        pass
+    if hasattr(mip, "HIGHS") and importlib.util.find_spec("highspy") is not None:
+        return mip.HIGHS
+    return mip.CBC
+
+PREFERRED_SOLVER = _pick_default_solver()
+
+
+def new_model(solver_name:str, **kwargs)->mip.Model:
+    """
+    Create a mip Model with the given solver; fall back to CBC if the solver cannot be started (e.g. Gurobi without a license).
+    Failures of the solver while solving are handled by solve_model.
+    """
+    try:
+        return mip.Model(solver_name=solver_name, **kwargs)
+    except Exception as error:
+        if solver_name == mip.CBC:
+            raise
+        logger.warning("Cannot start solver %s (%s) - falling back to CBC", solver_name, error)
+        return mip.Model(solver_name=mip.CBC, **kwargs)
+
+
+def solve_model(model: mip.Model, time_limit: float)->mip.OptimizationStatus:
+    """
+    Run the solver of the model, and return the status.
+    If a solver other than CBC fails while solving (e.g. Gurobi with a size-limited license), a warning is logged and None is returned;
+    the caller should then build the model again with CBC.
+    """
+    try:
+        status = model.optimize(max_seconds=time_limit)
+    except Exception as error:
+        if model.solver_name.upper() == mip.CBC:
+            raise
+        logger.warning("Solver %s failed (%s) - solving again with CBC", model.solver_name, error)
+        return None
+    if status == mip.OptimizationStatus.ERROR and model.solver_name.upper() != mip.CBC:
+        logger.warning("Solver %s returned an error status - solving again with CBC", model.solver_name)
+        return None
+    return status
+
+
+def count_name(iitem: int, ibin: int)->str:
+    """
+    The name of the variable counting the copies of item i in bin j, in both the model file and the solution file.
+    """
+    return f"item{iitem}_in_bin{ibin}"
+
+
+def new_counts(model: mip.Model, copies: List[int], numbins: int)->mip.LinExprTensor:
+    """
+    Add the integer count variables to the model: counts[i,j] is the number of copies of item i in bin j.
+    The lower bound 0 makes them non-negative, and a bin cannot contain more copies of item i than there are in total.
+
+    >>> counts = new_counts(mip.Model(solver_name=mip.CBC), [3, 1], 2)
+    >>> counts.shape, counts[0,1].name, counts[0,1].ub
+    ((2, 2), 'item0_in_bin1', 3.0)
+    """
+    return np.array([
+        [model.add_var(name=count_name(iitem, ibin), var_type=mip.INTEGER, lb=0, ub=copies[iitem]) for ibin in range(numbins)]
+        for iitem in range(len(copies))
+    ], dtype=object).reshape(len(copies), numbins).view(mip.LinExprTensor)
+
+
+def no_additional_constraints(sums):
+    return []
+
+
+# Optimal solutions of previous calls, keyed by a fixed-size digest of the structure of the ILP (see _solution_key).
+# Recursive algorithms often solve the same ILP several times (e.g. with different additional constraints);
+# the previous solution is given to the solver as a starting point (MIPStart).
+# Each entry holds one counts matrix (items x bins), so only a few recent solutions are kept.
+_previous_solutions = {}
+_MAX_PREVIOUS_SOLUTIONS = 16
 
 
 def optimal(
     binner: Binner, numbins: int, items: List[any],
     objective: obj.Objective = obj.MinimizeDifference,
     time_limit=inf,
-    additional_constraints:Callable=lambda sums:[],
+    additional_constraints:Callable=no_additional_constraints,
     entitlements:List[float]=None,
     verbose=0,
-    solver_name = mip.CBC, # passed to MIP. See https://docs.python-mip.com/en/latest/quickstart.html#creating-models. 
-    # solver_name = mip.GRB, # passed to MIP. See https://docs.python-mip.com/en/latest/quickstart.html#creating-models. 
+    solver_name = PREFERRED_SOLVER, # passed to MIP. See https://docs.python-mip.com/en/latest/quickstart.html#creating-models. 
+    emphasis = mip.SearchEmphasis.DEFAULT,
+    max_mip_gap = 1e-4,   # the default of python-mip
     model_filename = None,  
     solution_filename = None,  
 ):
@@ -39,10 +130,14 @@ def optimal(
     :param objective: whether to maximize the smallest sum, minimize the largest sum, etc.
     :param outputtype: whether to return the entire partition, or just the sums, etc.
     :param time_limit: stop the computation after this number of seconds have passed.
-    :param additional_constraints: a function that accepts the list of sums in ascending order, and returns a list of possible additional constraints on the sums.
+    :param additional_constraints: a function that accepts the list of sums (in ascending order, if all entitlements are equal), and returns a list of possible additional constraints on the sums.
     :param entitlements: if given, must be of size bins.num. Divides each sum by its weight before applying the objective function.
-    :param solver_name: passed to MIP. See https://docs.python-mip.com/en/latest/quickstart.html#creating-models
-    :param model_filename: if not None, the MIP model will be written into this file, for debugging. NOTE: The extension should be either ".lp" or ".mps" (it indicates the output format)
+                         With unequal entitlements, the bin sums are not in ascending order; objectives other than those in prtpy.objectives
+                         are then given the unordered sums, and must return a linear expression of them.
+    :param solver_name: passed to MIP. See https://docs.python-mip.com/en/latest/quickstart.html#creating-models. Default: the fastest solver available (see PREFERRED_SOLVER); CBC is used if it cannot be started, or if it fails while solving.
+    :param emphasis: passed to MIP. Use mip.SearchEmphasis.FEASIBILITY when a good solution is needed fast, e.g. inside a heuristic.
+    :param max_mip_gap: passed to MIP. The solver stops when the relative gap between the best solution and the lower bound is at most this value; a larger gap gives a faster, possibly sub-optimal solution.
+    :param model_filename: if not None, the MIP model will be written into this file, for debugging. NOTE: The extension should be either ".lp" or ".mps" (it indicates the output format; ".mps" is more compact for large models)
     :param solution_filename: if not None, the solution will be written into this file, for debugging.
 
     >>> from prtpy import BinnerKeepingContents, BinnerKeepingSums
@@ -72,18 +167,26 @@ def optimal(
     Bin #2: [...], sum=89.0
     >>> optimal(BinnerKeepingSums(), 3, walter_numbers, objective=obj.MaximizeSmallestSum)
     array([56., 56., 65.])
+    >>> optimal(BinnerKeepingSums(), 3, walter_numbers, objective=obj.MaximizeSmallestSum, emphasis=mip.SearchEmphasis.FEASIBILITY, max_mip_gap=0.1)[0] >= 0.9*56
+    True
 
     >>> items = [11.1, 11, 11, 11, 22]
     >>> optimal(BinnerKeepingSums(), 2, items, objective=obj.MaximizeSmallestSum, entitlements=[1,1])
     array([33. , 33.1])
     >>> optimal(BinnerKeepingSums(), 2, items, objective=obj.MaximizeSmallestSum, entitlements=[1,2])
-    array([22. , 44.1])
+    array([22.1, 44. ])
     >>> optimal(BinnerKeepingSums(), 2, items, objective=obj.MaximizeSmallestSum, entitlements=[10,2])
-    array([11.1, 55. ])
+    array([55.1, 11. ])
+
+    With unequal entitlements, the bins are not interchangeable, so the bin sums are not forced into ascending order:
+    >>> optimal(BinnerKeepingSums(), 2, [3, 3], objective=obj.MaximizeSmallestSum, entitlements=[1,2])
+    array([3., 3.])
+    >>> optimal(BinnerKeepingSums(), 3, [3, 3, 3, 3], objective=obj.MinimizeDifference, entitlements=[2,1,1])
+    array([6., 3., 3.])
 
     >>> from prtpy import partition
     >>> partition(algorithm=optimal, numbins=3, items={"a":1, "b":2, "c":3, "d":3, "e":5, "f":9, "g":9}) #doctest: +ELLIPSIS
-    [['a', 'g'], [...], [...]]
+    [['a', ...], [...], [...]]
     >>> partition(algorithm=optimal, numbins=2, items={"a":1, "b":2, "c":3, "d":3, "e":5, "f":9, "g":9}, outputtype=out.Sums)
     [16.0, 16.0]
 
@@ -103,76 +206,319 @@ def optimal(
 
     # Example with copies
     >>> partition(algorithm=optimal, numbins=3, items=[1, 2, 3], copies=[2, 1, 4])
-    [[2, 3], [1, 1, 3], [3, 3]]
+    [[1, 1, 3], [2, 3], [3, 3]]
     >>> partition(algorithm=optimal, numbins=3, items={"a": 11, "b": 22, "c": 33}, copies={"a": 2, "b": 1, "c": 4})
-    [['b', 'c'], ['a', 'a', 'c'], ['c', 'c']]
+    [['a', 'a', 'c'], ['b', 'c'], ['c', 'c']]
+
+    Trivial cases are solved without an ILP:
+    >>> optimal(BinnerKeepingSums(), 1, walter_numbers)
+    array([177.])
+    >>> optimal(BinnerKeepingSums(), 4, [5, 1, 3])
+    array([0., 1., 3., 5.])
     """
     if objective == obj.MinimizeDistAvg:
         from prtpy.partitioning.integer_programming_avg import optimal as optimal_avg
-        return optimal_avg(binner, numbins, items, entitlements=entitlements, time_limit=time_limit, verbose=verbose, solver_name=solver_name, model_filename=model_filename, solution_filename=solution_filename)
+        return optimal_avg(binner, numbins, items, entitlements=entitlements, time_limit=time_limit, verbose=verbose, solver_name=solver_name, emphasis=emphasis, max_mip_gap=max_mip_gap, model_filename=model_filename, solution_filename=solution_filename)
 
-    ibins = range(numbins)
     items = list(items)
-    # iitems = range(len(items))   # We need different indices for items with identical value
     if entitlements is None:
         entitlements = numbins*[1]
 
-    model = mip.Model(name = '', solver_name=solver_name)
-    counts: dict = {
-        iitem: [model.add_var(var_type=mip.INTEGER, name=f'item{iitem}_in_bin{ibin}') for ibin in ibins] 
-        for iitem,item in enumerate(items)
-    }  # counts[i][j] is a variable that represents how many times item i appears in bin j.
+    # Each item gets its own row of count variables. Merging items with equal values into one row, or ordering the rows of such items
+    # with symmetry-breaking constraints, makes the solver much slower on inputs with many duplicates (e.g. 100 items with values in 1..9).
+    values = [binner.valueof(item) for item in items]
+    copies = [binner.copiesof(item) for item in items]
+
+    if (numbins == 1 or sum(copies) <= numbins) and len(set(entitlements)) <= 1 \
+        and additional_constraints is no_additional_constraints and model_filename is None:
+        # Trivial case: all items in one bin, or each item in its own bin. This is optimal for every objective with equal entitlements.
+        solution_counts = greedy_counts(values, copies, numbins)
+    else:
+        solution_counts = _solve(values, copies, numbins, objective, time_limit, additional_constraints, entitlements, verbose, solver_name, emphasis, max_mip_gap, model_filename)
+    if solution_filename is not None:   # the solver's own solution, so that it matches the variables of the model file.
+        write_solution(solution_filename, solution_counts)
+
+    if len(set(entitlements)) <= 1:   # otherwise, bin j must stay the bin with entitlement j.
+        solution_counts = canonical_bin_order(values, solution_counts)
+    output = fill_bins_from_counts(binner, numbins, items, solution_counts)
+    return output
+
+
+def _solve(values, copies, numbins, objective, time_limit, additional_constraints, entitlements, verbose, solver_name, emphasis, max_mip_gap, model_filename):
+    """
+    Solve the partition ILP, and return the optimal counts: counts[i][j] is the number of copies of item i in bin j.
+    """
+    ibins = range(numbins)
+    iitems = range(len(values))
+    model, counts, bin_sums = build_model(values, copies, numbins, entitlements, solver_name)
+
+    if len(set(entitlements)) <= 1:   # build_model ordered the bin sums.
+        model.objective = mip.minimize(
+            objective.value_to_minimize(bin_sums, are_sums_in_ascending_order=True)        
+        )
+    else:
+        model.objective = mip.minimize(unordered_value_to_minimize(model, objective, bin_sums))
+    logger.debug("Objective: %s", model.objective)
+    for constraint in additional_constraints(bin_sums): model += constraint
+
+    # Solve the ILP:
+    model.verbose = verbose
+    model.emphasis = emphasis
+    model.max_mip_gap = max_mip_gap
+    if  model_filename is not None:
+        write_model(model, model_filename)
+    # logger.info("MIP model: %s", model)
+    solution_key = _solution_key(values, copies, numbins, objective, entitlements, solver_name)
+    previous_solution = _previous_solutions.get(solution_key)
+    if previous_solution is None and len(set(entitlements)) <= 1:
+        previous_solution = heuristic_counts(values, copies, numbins, objective)   # a good initial incumbent for the branch-and-bound.
+    if previous_solution is not None:   # if it violates the additional constraints, the solver just ignores it.
+        model.start = [(counts[iitem,ibin], previous_solution[iitem][ibin]) for iitem in iitems for ibin in ibins]
+    status = solve_model(model, time_limit)
+    if status is None:
+        return _solve(values, copies, numbins, objective, time_limit, additional_constraints, entitlements, verbose, mip.CBC, emphasis, max_mip_gap, model_filename)
+    if status != mip.OptimizationStatus.OPTIMAL:
+        raise ValueError(f"Problem status is not optimal - it is {status}.")
+
+    solution_counts = np.rint([var.x for var in counts.flat]).astype(int).reshape(counts.shape)   # rint, since the solver may return e.g. 0.9999999 instead of 1.
+    if len(_previous_solutions) >= _MAX_PREVIOUS_SOLUTIONS:
+        _previous_solutions.pop(next(iter(_previous_solutions)))   # forget the oldest solution.
+    _previous_solutions[solution_key] = solution_counts
+    return solution_counts
+
+
+def _solution_key(values: List[float], copies: List[int], numbins: int, objective: obj.Objective, entitlements: List[float], solver_name: str)->bytes:
+    """
+    A 16-byte digest of everything that determines the ILP apart from the additional constraints,
+    so that the cache of previous solutions does not keep the values of large inputs alive.
+
+    >>> key = _solution_key([11, 22], [1, 1], 2, obj.MinimizeDifference, [1, 1], "CBC")
+    >>> len(key)
+    16
+    >>> key == _solution_key([11, 22], [1, 1], 2, obj.MinimizeDifference, [1, 1], "CBC")
+    True
+    >>> key == _solution_key([11, 22], [1, 2], 2, obj.MinimizeDifference, [1, 1], "CBC")
+    False
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.asarray(values, dtype=float).tobytes())
+    digest.update(np.asarray(copies, dtype=np.int64).tobytes())
+    digest.update(np.asarray(entitlements, dtype=float).tobytes())
+    digest.update(f"{len(values)}|{numbins}|{objective}|{solver_name}".encode())
+    return digest.digest()
+
+
+def build_model(values: List[float], copies: List[int], numbins: int, entitlements: List[float], solver_name: str = PREFERRED_SOLVER):
+    """
+    Build the part of the partition ILP that does not depend on the objective:
+    the count variables, and the constraints that every item is in exactly one bin and (if all entitlements are equal) that the bin sums are in ascending order.
+    Returns the model, the tensor of count variables, and the list of (weighted) bin-sum expressions.
+
+    The caller sets the objective and may add constraints. Since the model is kept, it can be re-solved
+    with a different objective or different temporary constraints, without rebuilding the variables:
+
+    >>> model, counts, bin_sums = build_model([11, 22], [3, 1], 2, [1, 1], solver_name=mip.CBC)
+    >>> model.verbose = 0
+    >>> model.objective = mip.minimize(bin_sums[-1])
+    >>> _ = model.optimize()
+    >>> [bin_sum.x for bin_sum in bin_sums]
+    [22.0, 33.0]
+    >>> temporary = model.add_constr(bin_sums[0] == 0)
+    >>> _ = model.optimize()
+    >>> [bin_sum.x for bin_sum in bin_sums]
+    [0.0, 55.0]
+    >>> model.remove(temporary)
+    >>> _ = model.optimize()
+    >>> [bin_sum.x for bin_sum in bin_sums]
+    [22.0, 33.0]
+    """
+    ibins = range(numbins)
+    iitems = range(len(values))
+    model = new_model(solver_name, name = '')
+    counts = new_counts(model, copies, numbins)
+    # counts[i,j] is a variable that represents how many copies of item i appear in bin j.
     logger.debug("counts: %s", counts)
     bin_sums = [
-        sum([counts[iitem][ibin] * binner.valueof(item) for iitem,item in enumerate(items)])/entitlements[ibin] 
+        mip.LinExpr(variables=list(counts[:,ibin]), coeffs=values)/entitlements[ibin] 
         for ibin in ibins
-    ]  # bin_sums[j] is a variable-expression that represents the sum of values in bin j.
+    ]  # bin_sums[j] is a variable-expression that represents the sum of values in bin j. It is constructed directly from its coefficients, without temporary expressions.
     logger.debug("bin_sums: %s", bin_sums)
 
-    model.objective = mip.minimize(
-        objective.value_to_minimize(bin_sums, are_sums_in_ascending_order=True)        
-    )
-    logger.debug("Objective: %s", model.objective)
-
     # Construct the list of constraints:
-    counts_are_non_negative = [counts[iitem][ibin] >= 0 for ibin in ibins for iitem,item in enumerate(items)]
     each_item_in_one_bin = [
-        sum([counts[iitem][ibin] for ibin in ibins]) == binner.copiesof(item) for iitem,item in enumerate(items)
+        mip.LinExpr(variables=list(counts[iitem,:]), coeffs=[1]*numbins) == copies[iitem] for iitem in iitems
     ]
-    bin_sums_in_ascending_order = [  # a symmetry-breaker
+    bin_sums_in_ascending_order = [  # a symmetry-breaker. It is valid only when all bins are alike, i.e., have the same entitlement.
         bin_sums[ibin + 1] >= bin_sums[ibin] for ibin in range(numbins - 1)
-    ]
-    constraints = counts_are_non_negative + each_item_in_one_bin + bin_sums_in_ascending_order + additional_constraints(bin_sums)
-    for constraint in constraints: model += constraint
+    ] if len(set(entitlements)) <= 1 else []
+    for constraint in each_item_in_one_bin + bin_sums_in_ascending_order: model += constraint
+    return model, counts, bin_sums
 
-    # Solve the ILP:
-    model.verbose = verbose
-    if  model_filename is not None:
-        model.write(model_filename)
-    # logger.info("MIP model: %s", model)
-    status = model.optimize(max_seconds=time_limit)
-    if status != mip.OptimizationStatus.OPTIMAL:
-        raise ValueError(f"Problem status is not optimal - it is {status}.")
 
-    # Construct the output:
+def unordered_value_to_minimize(model: mip.Model, objective: obj.Objective, bin_sums: list):
+    """
+    Return a linear expression for the objective, when the bin sums are not known to be in ascending order.
+    The sum of the k largest bin sums is the minimum over t of k*t + sum(max(0, s_j-t)), and
+    the sum of the k smallest bin sums is the maximum over t of k*t - sum(max(0, t-s_j)).
+    Both are modelled with auxiliary variables, which the solver sets optimally when minimizing the objective.
+
+    >>> model = mip.Model(solver_name=mip.CBC)
+    >>> model.verbose = 0
+    >>> sums = [model.add_var(lb=s, ub=s) for s in [3, 1, 2]]
+    >>> model.objective = mip.minimize(unordered_value_to_minimize(model, obj.MinimizeDifference, sums))
+    >>> _ = model.optimize()
+    >>> model.objective_value
+    2.0
+
+    Other objectives are passed the bin sums as they are:
+    >>> class MinimizeTheFirstSum(obj.Objective):
+    ...     def value_to_minimize(self, sums, are_sums_in_ascending_order=False):
+    ...         return sums[0]
+    >>> model.objective = mip.minimize(unordered_value_to_minimize(model, MinimizeTheFirstSum(), sums))
+    >>> _ = model.optimize()
+    >>> model.objective_value
+    3.0
+    """
+    def k_largest(k):
+        t = model.add_var(lb=-inf)
+        excesses = [model.add_var(lb=0) for _ in bin_sums]
+        for excess, bin_sum in zip(excesses, bin_sums): model.add_constr(excess >= bin_sum - t)
+        return k*t + mip.xsum(excesses)
+    def k_smallest(k):
+        t = model.add_var(lb=-inf)
+        shortages = [model.add_var(lb=0) for _ in bin_sums]
+        for shortage, bin_sum in zip(shortages, bin_sums): model.add_constr(shortage >= t - bin_sum)
+        return k*t - mip.xsum(shortages)
+
+    if isinstance(objective, obj.MaximizeTheSmallestSum):
+        return -k_smallest(1)
+    elif isinstance(objective, obj.MaximizeKSmallestSums):
+        return -k_smallest(objective.num_smallest_parts)
+    elif isinstance(objective, obj.MinimizeTheLargestSum):
+        return k_largest(1)
+    elif isinstance(objective, obj.MinimizeKLargestSums):
+        return k_largest(objective.num_smallest_parts)
+    elif isinstance(objective, obj.MinimizeTheDifference):
+        return k_largest(1) - k_smallest(1)
+    else:   # e.g. a user-defined objective; it must return a linear expression of the (unordered) bin sums.
+        return objective.value_to_minimize(bin_sums, are_sums_in_ascending_order=False)
+
+
+def greedy_counts(values: List[float], copies: List[int], numbins: int)->List[List[int]]:
+    """
+    Run the greedy (LPT) algorithm on the ILP rows, and return its partition as an ILP solution:
+    counts[i][j] is the number of copies of row i in bin j. The bins are in ascending order of sum.
+
+    >>> greedy_counts([11, 22], [3, 1], 2)
+    [[2, 1], [0, 1]]
+    """
+    binner = BinnerKeepingContents(valueof=values.__getitem__)
+    bins = greedy(binner, numbins, _expand_copies(copies))
+    binner.sort_by_ascending_sum(bins)
+    return _counts_from_bins(bins, len(values), numbins)
+
+
+def heuristic_counts(values: List[float], copies: List[int], numbins: int, objective: obj.Objective)->List[List[int]]:
+    """
+    Run the greedy (LPT) and the Karmarkar-Karp algorithms on the ILP rows,
+    and return the partition that is better for the given objective as an ILP solution (see greedy_counts).
+
+    >>> heuristic_counts([8, 7, 6, 5, 4], [1, 1, 1, 1, 1], 2, obj.MinimizeDifference)   # greedy gives sums 13, 17; KK gives 14, 16.
+    [[1, 0], [0, 1], [1, 0], [0, 1], [0, 1]]
+    >>> heuristic_counts([11, 22], [3, 1], 2, obj.MinimizeDifference)   # on ties, greedy is preferred.
+    [[2, 1], [0, 1]]
+    """
+    binner = BinnerKeepingContents(valueof=values.__getitem__)
+    item_indices = _expand_copies(copies)
+    candidates = [greedy(binner, numbins, item_indices), kk(binner, numbins, item_indices)]
+    for bins in candidates:
+        binner.sort_by_ascending_sum(bins)
+    best_bins = min(candidates, key=lambda bins: objective.value_to_minimize(binner.sums(bins), are_sums_in_ascending_order=True))
+    return _counts_from_bins(best_bins, len(values), numbins)
+
+
+def canonical_bin_order(values: List[float], counts: List[List[int]])->np.ndarray:
+    """
+    Reorder the bins (columns) of an ILP solution by ascending sum; bins with equal sums are ordered
+    by decreasing counts of the first rows. The output then does not depend on which of several
+    symmetric optimal solutions the solver (or its MIP start) happened to return.
+
+    >>> canonical_bin_order([10, 20, 40], [[0, 2], [0, 1], [1, 0]])   # both sums are 40; the bin with row 0 comes first.
+    array([[2, 0],
+           [1, 0],
+           [0, 1]])
+    >>> canonical_bin_order([10, 20, 40], [[1, 0], [0, 0], [0, 1]])
+    array([[1, 0],
+           [0, 0],
+           [0, 1]])
+    """
+    counts = np.asarray(counts)
+    sums = np.asarray(values) @ counts
+    order = sorted(range(counts.shape[1]), key=lambda ibin: (sums[ibin], tuple(-counts[:, ibin])))
+    return counts[:, order]
+
+
+def _expand_copies(copies: List[int])->List[int]:
+    """ Return a list in which each index i appears copies[i] times. """
+    return [iitem for iitem in range(len(copies)) for _ in range(copies[iitem])]
+
+
+def _counts_from_bins(bins, numvalues: int, numbins: int)->List[List[int]]:
+    """ Convert a bins-array of value indices into an ILP solution. """
+    _, lists = bins
+    counts = [[0]*numbins for _ in range(numvalues)]
+    for ibin, bin_items in enumerate(lists):
+        for iitem in bin_items:
+            counts[iitem][ibin] += 1
+    return counts
+
+
+def fill_bins_from_counts(binner: Binner, numbins: int, items: List[any], counts: List[List[int]]):
+    """
+    Construct a bins-array from an ILP solution.
+    counts[i][j] is the number of copies of items[i] that should go to bin j.
+
+    >>> from prtpy import printbins
+    >>> printbins(fill_bins_from_counts(BinnerKeepingContents(), 2, [11, 22], [[1, 2], [1, 0]]))
+    Bin #0: [11, 22], sum=33.0
+    Bin #1: [11, 11], sum=22.0
+    """
     output = binner.new_bins(numbins)
-    for ibin in ibins:
-        for iitem,item in enumerate(items):
-            count_item_in_bin = int(counts[iitem][ibin].x)
-            for _ in range(count_item_in_bin):
+    for ibin in range(numbins):
+        for iitem, item in enumerate(items):
+            for _ in range(counts[iitem][ibin]):
                 binner.add_item_to_bin(output, item, ibin)
-    binner.sort_by_ascending_sum(output)
-
-    if solution_filename is not None:
-        with open(solution_filename,"w") as solution_file:
-            for ibin in ibins:
-                for iitem,item in enumerate(items):
-                    count_item_in_bin = int(counts[iitem][ibin].x)
-                    # solution_file.write(f'item{binner.valueof(items[iitem]):05d}_in_bin{ibin} = {count_item_in_bin}\n')
-                    solution_file.write(f'item{iitem}_in_bin{ibin} = {count_item_in_bin}\n')
     return output
 
 
+def write_model(model: mip.Model, model_filename: str):
+    """
+    Write the MIP model into a file, for debugging.
+    The extension of the file name determines the format: ".lp" is readable, ".mps" is more compact for large models.
+    With any other extension, a warning is logged and ".lp" is appended to the file name.
+    """
+    model_filename = str(model_filename)
+    if not model_filename.lower().endswith((".lp", ".mps")):
+        logger.warning("Model file name %s does not end with .lp or .mps - writing the model to %s.lp", model_filename, model_filename)
+        model_filename += ".lp"
+    model.write(model_filename)
+
+
+def write_solution(solution_filename: str, counts: List[List[int]]):
+    """
+    Write an ILP solution into a text file, for debugging.
+    counts[i][j] is the number of copies of item i in bin j; it is written as the line "{count_name(i,j)} = {counts[i][j]}",
+    with the variable names of the model file.
+    """
+    numitems = len(counts)
+    numbins = len(counts[0]) if numitems > 0 else 0
+    with open(solution_filename,"w") as solution_file:
+        solution_file.writelines(
+            f'{count_name(iitem, ibin)} = {counts[iitem][ibin]}\n'
+            for ibin in range(numbins) for iitem in range(numitems)
+        )
+
+
 if __name__ == "__main__":
     import doctest, logging
     logger.setLevel(logging.INFO)
@@ -180,7 +526,7 @@ if __name__ == "__main__":
 
     print(doctest.testmod(report=True, optionflags=doctest.FAIL_FAST))
 
-    from prtpy import BinnerKeepingContents, BinnerKeepingSums, partition
+    from prtpy import BinnerKeepingSums, partition
     # print(partition(algorithm=optimal, numbins=3, items={"a": 11, "b": 22, "c": 33}, copies={"a": 2, "b": 1, "c": 4}))
     # print(partition(algorithm=optimal, numbins=2, items=[11,11,11,11,22], objective=obj.MaximizeSmallestSum))
 
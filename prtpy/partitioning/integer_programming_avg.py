@@ -11,14 +11,18 @@ from typing import List, Callable, Any
 from numbers import Number
 
 from prtpy import objectives as obj, outputtypes as out, Binner, printbins
+from prtpy.partitioning.integer_programming import new_counts, fill_bins_from_counts, write_model, write_solution, new_model, solve_model, PREFERRED_SOLVER
 from math import inf
+import numpy as np
 import mip
 
 def optimal(
     binner: Binner, numbins: int, items: List[any], entitlements: List[any] = None,
     time_limit=inf,  # time limit in seconds
     verbose=0,
-    solver_name=mip.CBC, # [or mip.GRB] passed to MIP. See https://docs.python-mip.com/en/latest/quickstart.html#creating-models.
+    solver_name=PREFERRED_SOLVER, # [or mip.CBC, mip.GRB] passed to MIP. See https://docs.python-mip.com/en/latest/quickstart.html#creating-models.
+    emphasis=mip.SearchEmphasis.DEFAULT,
+    max_mip_gap=1e-4,   # the default of python-mip
     model_filename = None,  
     solution_filename = None, 
 ):
@@ -31,7 +35,9 @@ def optimal(
     :param time_limit: stop the computation after this number of seconds have passed.
     :param valueof: a function that maps an item from the list `items` to a number representing its value.
     :param solver_name: passed to MIP. See https://docs.python-mip.com/en/latest/quickstart.html#creating-models
-    :param model_filename: if not None, the MIP model will be written into this file, for debugging. NOTE: The extension should be either ".lp" or ".mps" (it indicates the output format)
+    :param emphasis: passed to MIP. Use mip.SearchEmphasis.FEASIBILITY when a good solution is needed fast.
+    :param max_mip_gap: passed to MIP. A larger gap gives a faster, possibly sub-optimal solution.
+    :param model_filename: if not None, the MIP model will be written into this file, for debugging. NOTE: The extension should be either ".lp" or ".mps" (it indicates the output format; ".mps" is more compact for large models)
     :param solution_filename: if not None, the solution will be written into this file, for debugging.
 
     >>> from prtpy import BinnerKeepingContents, BinnerKeepingSums
@@ -74,22 +80,24 @@ def optimal(
     >>> partition(algorithm=optimal, numbins=3, items=[1, 2, 3], copies=[2, 1, 4])
     [[2, 3], [1, 1, 3], [3, 3]]
     >>> partition(algorithm=optimal, numbins=3, items={"a": 11, "b": 22, "c": 33}, copies={"a": 2, "b": 1, "c": 4})
-    [['a', 'a', 'c'], ['b', 'c'], ['c', 'c']]
+    [['b', 'c'], ['a', 'a', 'c'], ['c', 'c']]
     """
     ibins = range(numbins)
     items = list(items)
-    model = mip.Model(name='', sense='MIN', solver_name=solver_name)
-    counts: dict = {
-        iitem: [model.add_var(var_type=mip.INTEGER) for ibin in ibins]
-        for iitem,item in enumerate(items)
-    }  # counts[i][j] is a variable that represents how many times item i appears in bin j.
+    values = [binner.valueof(item) for item in items]
+    copies = [binner.copiesof(item) for item in items]
+    iitems = range(len(values))
+
+    model = new_model(solver_name, name='', sense='MIN')
+    counts = new_counts(model, copies, numbins)
+    # counts[i,j] is a variable that represents how many copies of item i appear in bin j.
 
     bin_sums = [
-        sum([counts[iitem][ibin] * binner.valueof(items[iitem]) for iitem,item in enumerate(items)])
+        mip.LinExpr(variables=list(counts[:,ibin]), coeffs=values)
         for ibin in ibins
-    ]
+    ]  # constructed directly from the coefficients, without temporary expressions.
 
-    sum_values = sum([binner.valueof(item)*binner.copiesof(item) for item in items])
+    sum_values = float(np.dot(values, copies))
 
     effective_entitlements = entitlements or [1. / numbins for ibin in ibins]
     z_js = [
@@ -98,30 +106,34 @@ def optimal(
     ]
 
     t_js = [
-        model.add_var(var_type=mip.INTEGER) for ibin in ibins
-    ]
+        model.add_var(var_type=mip.INTEGER, lb=0) for ibin in ibins
+    ]  # t_js[j] >= |z_js[j]|. Integer slacks let CBC close the gap far faster than continuous ones.
 
 
     model.objective = mip.minimize(
-        0.5 * sum(t_js)
+        0.5 * mip.xsum(t_js)
     )
 
     # Construct the list of constraints:
     t_js_greater_than_z_js = [t_js[ibin] >= z_js[ibin] for ibin in ibins]
     t_js_greater_than_minus_z_js = [t_js[ibin] >= -z_js[ibin] for ibin in ibins]
-    counts_are_non_negative = [counts[iitem][ibin] >= 0 for ibin in ibins for iitem,item in enumerate(items)]
     each_item_in_one_bin = [
-        sum([counts[iitem][ibin] for ibin in ibins]) == binner.copiesof(item) for iitem,item in enumerate(items)
+        mip.LinExpr(variables=list(counts[iitem,:]), coeffs=[1]*numbins) == copies[iitem] for iitem in iitems
     ]
-    constraints = each_item_in_one_bin + t_js_greater_than_z_js + t_js_greater_than_minus_z_js + counts_are_non_negative
+    constraints = each_item_in_one_bin + t_js_greater_than_z_js + t_js_greater_than_minus_z_js
     for constraint in constraints: model += constraint
 
 # Solve the ILP:
     model.verbose = verbose
+    model.emphasis = emphasis
+    model.max_mip_gap = max_mip_gap
     if  model_filename is not None:
-        model.write(model_filename)
+        write_model(model, model_filename)
     # logger.info("MIP model: %s", model)
-    status = model.optimize(max_seconds=time_limit)
+    status = solve_model(model, time_limit)
+    if status is None:   # the solver failed while solving - solve again with CBC.
+        return optimal(binner, numbins, items, entitlements, time_limit=time_limit, verbose=verbose, solver_name=mip.CBC, emphasis=emphasis,
+            max_mip_gap=max_mip_gap, model_filename=model_filename, solution_filename=solution_filename)
 
     # Check problem status:
     if time_limit == inf:
@@ -133,22 +145,13 @@ def optimal(
 
     
     # Construct the output:
-    output = binner.new_bins(numbins)
-    for ibin in ibins:
-        for iitem,item in enumerate(items):
-            count_item_in_bin = int(counts[iitem][ibin].x)
-            for _ in range(count_item_in_bin):
-                binner.add_item_to_bin(output, items[iitem], ibin)
+    solution_counts = np.rint([var.x for var in counts.flat]).astype(int).reshape(counts.shape)   # rint, since the solver may return e.g. 0.9999999 instead of 1.
+    output = fill_bins_from_counts(binner, numbins, items, solution_counts)
     if not entitlements:
         binner.sort_by_ascending_sum(output)
 
     if solution_filename is not None:
-        with open(solution_filename,"w") as solution_file:
-            for ibin in ibins:
-                for iitem,item in enumerate(items):
-                    count_item_in_bin = int(counts[iitem][ibin].x)
-                    # solution_file.write(f'item{binner.valueof(items[iitem]):05d}_in_bin{ibin} = {count_item_in_bin}\n')
-                    solution_file.write(f'item{iitem}_in_bin{ibin} = {count_item_in_bin}\n')
+        write_solution(solution_filename, solution_counts)
                     
     return output
 
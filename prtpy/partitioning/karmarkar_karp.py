@@ -11,6 +11,7 @@ from prtpy import outputtypes as out, objectives as obj
 from prtpy.binners import Binner, BinsArray, printbins
 import heapq, logging
 from itertools import count
+from collections import deque
 
 logger = logging.getLogger(__name__)
 
@@ -25,14 +26,42 @@ class BinsSortedByMaxDiff:
         self.heap_count = count()       # To avoid ambiguity in heap
         self.binner = binner
 
-    def push(self, bins: BinsArray):
-        self.binner.sort_by_ascending_sum(bins)
+    def push(self, bins: BinsArray, already_sorted: bool = False):
+        if not already_sorted:
+            self.binner.sort_by_ascending_sum(bins)
         bins_sums = self.binner.sums(bins)
         bins_diff = bins_sums[-1] - bins_sums[0]     # To sort by descending difference
         new_state = (-bins_diff, next(self.heap_count), bins)
         logger.debug("  New state: %s", new_state)
         heapq.heappush(self.bins_heap, new_state)
 
+    def push_many(self, bins_arrays):
+        """ 
+        Push several bins-arrays at once. 
+        Faster than pushing them one by one, since the heap is built in linear time by heapify.
+        """
+        for bins in bins_arrays:
+            self.binner.sort_by_ascending_sum(bins)
+            bins_sums = self.binner.sums(bins)
+            self.bins_heap.append((-(bins_sums[-1] - bins_sums[0]), next(self.heap_count), bins))
+        heapq.heapify(self.bins_heap)
+
+    def push_singletons(self, items: List[Any], numbins: int):
+        """ 
+        Push, for each item, a bins-array in which the last bin contains only this item and the other bins are empty.
+        Such bins-arrays are already sorted by ascending sum (for a non-negative item), and their difference is the item value,
+        so they are pushed without sorting them or computing their sums.
+        """
+        for item in items:
+            value = self.binner.valueof(item)
+            bins = self.binner.add_item_to_bin(self.binner.new_bins(numbins), item=item, bin_index=numbins-1)
+            if value < 0 or numbins == 1:    # the general (slow) path
+                self.binner.sort_by_ascending_sum(bins)
+                bins_sums = self.binner.sums(bins)
+                value = bins_sums[-1] - bins_sums[0]
+            self.bins_heap.append((-value, next(self.heap_count), bins))
+        heapq.heapify(self.bins_heap)
+
     def pop(self)->BinsArray:
         _, _, bins = heapq.heappop(self.bins_heap) 
         return bins
@@ -99,6 +128,11 @@ def kk(binner: Binner, numbins: int, items: List[any]) -> BinsArray:
     [['c', 'a'], ['d', 'b'], ['e'], ['g'], ['f']]
     >>> partition(algorithm=kk, numbins=4, items=[1,2,3,3,5,9,9])
     [[3, 3, 1], [5, 2], [9], [9]]
+
+    Once the remaining k-tuples are all perfectly balanced, they are combined without further heap operations:
+    >>> printbins(kk(BinnerKeepingContents(), 2, items=[5, 5, 3, 3, 1, 1]))
+    Bin #0: [1, 5, 3], sum=9.0
+    Bin #1: [1, 5, 3], sum=9.0
     """
     numitems = len(items)
     logger.info("\nKarmarkar-Karp Partitioning of %d items into %d parts.", numitems, numbins)
@@ -108,22 +142,35 @@ def kk(binner: Binner, numbins: int, items: List[any]) -> BinsArray:
 
     # Explanation from Wikipedia: https://en.wikipedia.org/wiki/Largest_differencing_method#Multi-way_partitioning
     # 1. "Initially, for each number i in S, construct a k-tuple of subsets, in which one subset is {i} and the other k-1 subsets are empty.
-    for item in items:
-        new_bins = binner.add_item_to_bin(binner.new_bins(numbins), item=item, bin_index=numbins-1)
-        bins_heap.push(new_bins)
+    bins_heap.push_singletons(items, numbins)
 
     # 2. "In each iteration, select two k-tuples A and B in which the difference between the maximum and minimum sum is largest, 
     #    "   and combine them in reverse order of sizes, i.e.: smallest subset in A with largest subset in B, second-smallest in A with second-largest in B, etc."
     #    "   Proceed in this way until a single partition remains."
     for _ in range(numitems - 1):
+        if bins_heap.topdiff() == 0:
+            # The largest difference is 0, so all remaining k-tuples are perfectly balanced, and so is every combination of them.
+            # All keys are equal, so the heap would pop the k-tuples in the order they were pushed: a plain queue gives the same result.
+            queue = deque(bins for _, _, bins in sorted(bins_heap.bins_heap, key=lambda state: state[1]))
+            while len(queue) > 1:
+                bins1 = queue.popleft()
+                binner.combine_bins_in_reverse_order(bins1, queue.popleft())
+                binner.sort_by_ascending_sum(bins1)
+                queue.append(bins1)
+            return queue[0]
+
         # "-- select two k-tuples A and B in which the difference between the maximum and minimum sum is largest":
         bins1 = bins_heap.pop()
         bins2 = bins_heap.pop()
 
         # "-- combine them in reverse order of sizes":
-        for i in range(numbins):
-            binner.combine_bins(bins1, numbins-i-1, bins2, i)
-        bins_heap.push(bins1)
+        binner.combine_bins_in_reverse_order(bins1, bins2)
+        if numbins == 2:
+            # bins1 has the larger difference, so its larger bin stays larger after the combination, and there is nothing to sort.
+            bins_sums = binner.sums(bins1)
+            bins_heap.push(bins1, already_sorted=bins_sums[0] <= bins_sums[1])
+        else:
+            bins_heap.push(bins1)
 
     return bins_heap.top()
 
@@ -7,13 +7,18 @@ Programmer: Erel Segal-Halevi
 """
 
 from typing import Callable, List, Any
-import prtpy
-from prtpy import outputtypes as out, objectives as obj, Binner
-from prtpy.packing import first_fit
+from prtpy import objectives as obj, Binner
+import hashlib
 
 import logging
 logger = logging.getLogger(__name__)
 
+# Client code often partitions the same items several times (e.g. with different binners or output types);
+# the bin size found by the binary search depends only on the sorted values, so it is reused.
+# The cache is keyed by a fixed-size digest of the sorted values (not the values themselves), and holds only a few searches.
+_previous_binsizes = {}
+_MAX_PREVIOUS_BINSIZES = 16
+
 def multifit(binner: Binner, numbins: int, items: List[any], iterations = 10):
     """
     Partition the numbers using the MultiFit algorithm.
@@ -50,23 +55,91 @@ def multifit(binner: Binner, numbins: int, items: List[any], iterations = 10):
     >>> partition(algorithm=multifit, numbins=2, items={"a":1, "b":2, "c":3, "d":4})
     [['d', 'a'], ['c', 'b']]
     """
-    sum_values = sum(map(binner.valueof, items))
-    max_values = max(map(binner.valueof, items))
+    items = list(items)
+    values = [binner.valueof(item) for item in items]   # valueof is called once per item; the values keep their own type (e.g. Fraction).
+    order = sorted(range(len(items)), key=values.__getitem__, reverse=True)
+    sorted_items = [items[i] for i in order]
+    sorted_values = [values[i] for i in order]
+    search_key = (hashlib.blake2b(repr(sorted_values).encode(), digest_size=16).digest(), numbins, iterations)
+    binsize = _previous_binsizes.get(search_key)
+    if binsize is None:
+        binsize = _search_binsize(sorted_values, numbins, iterations)
+        if len(_previous_binsizes) >= _MAX_PREVIOUS_BINSIZES:
+            _previous_binsizes.pop(next(iter(_previous_binsizes)))   # forget the oldest search.
+        _previous_binsizes[search_key] = binsize
+    # The final first-fit is computed in the values' own arithmetic too, so it makes exactly the decisions of the search
+    # (the binner keeps float sums, which may be rounded e.g. for huge ints).
+    bin_indices = []
+    ffd_sums = _first_fit_sums(sorted_values, binsize, bin_indices)
+    bins = binner.new_bins(len(ffd_sums))
+    for item, ibin in zip(sorted_items, bin_indices):
+        binner.add_item_to_bin(bins, item, ibin)
+    return bins
+
+
+def _search_binsize(sorted_values: List[float], numbins: int, iterations: int) -> float:
+    """
+    Binary search for a small bin size with which FFD packs the given values (sorted in descending order) into at most numbins bins.
+
+    >>> _search_binsize([4, 3, 2, 1], numbins=2, iterations=10)
+    5
+    >>> _search_binsize([4, 3, 2, 1], numbins=2, iterations=0)   # no search: the largest sum of FFD with the initial upper bound 10.
+    10
+    """
+    sum_values = sum(sorted_values)
+    max_values = sorted_values[0]
     lower_bound = max(sum_values/numbins, max_values)  # With bin-capacity smaller than this, every packing must use more than `numbins` bins.
     upper_bound = max(2*sum_values/numbins, max_values) # With this bin-capacity, FFD always uses at most `numbins` bins.
     logger.info("MultiFit number partitioning with sum=%f, max=%f, lower-bound=%f, upper-bound=%f", sum_values, max_values, lower_bound, upper_bound)
 
-    sorted_items = sorted(items, key=binner.valueof, reverse=True)
+    found_packing = False
     for _ in range(iterations):
         binsize = (lower_bound+upper_bound)/2
-        ffd_num_of_bins = prtpy.pack(algorithm=prtpy.packing.first_fit, binsize=binsize, items=sorted_items, valueof=binner.valueof, outputtype=out.BinCount)
+        ffd_sums = _first_fit_sums(sorted_values, binsize)
+        ffd_num_of_bins = len(ffd_sums)
         logger.info("FFD with bin size %f needs %d bins", binsize, ffd_num_of_bins)
         if ffd_num_of_bins <= numbins:
-            upper_bound = binsize
+            # FFD with the largest sum as the bin size makes exactly the same decisions, so it is a tighter upper bound.
+            # The sums are computed in the values' own arithmetic, so the final (exact) first-fit gets the same packing.
+            upper_bound = max(ffd_sums)
+            found_packing = True
+            if upper_bound <= lower_bound:
+                break
         else:
             lower_bound = binsize
-            
-    return first_fit.online(binner, binsize=upper_bound, items=sorted_items)
+    if not found_packing:
+        # The initial upper bound is computed by division, and may be rounded below the exact bound (e.g. for huge ints).
+        ffd_sums = _first_fit_sums(sorted_values, upper_bound)
+        upper_bound = max(ffd_sums) if len(ffd_sums) <= numbins else sum_values
+    return upper_bound
+
+
+def _first_fit_sums(values: List[float], binsize: float, bin_indices: List[int] = None) -> List[float]:
+    """
+    Return the bin sums of first-fit on the given values, in the given order.
+    The sums are computed in the values' own arithmetic (e.g. Fraction), unlike the float sums kept by the binners.
+    A lightweight version of first_fit.online for multifit. If bin_indices is given, the bin of each value is appended to it.
+
+    >>> _first_fit_sums([9, 9, 5, 3, 3, 2, 1], binsize=9)
+    [9, 9, 9, 5]
+    >>> bin_indices = []
+    >>> _first_fit_sums([9, 9, 5, 3, 3, 2, 1], binsize=18, bin_indices=bin_indices)
+    [18, 14]
+    >>> bin_indices
+    [0, 0, 1, 1, 1, 1, 1]
+    """
+    sums = []
+    for value in values:
+        for ibin, bin_sum in enumerate(sums):
+            if bin_sum + value <= binsize:
+                sums[ibin] = bin_sum + value
+                break
+        else:  # if not added to any bin
+            ibin = len(sums)
+            sums.append(value)
+        if bin_indices is not None:
+            bin_indices.append(ibin)
+    return sums
 
 
 if __name__ == "__main__":
@@ -22,21 +22,13 @@ Date:    03-2022
 from typing import Callable, List
 from prtpy import outputtypes as out, objectives as obj, Binner, BinnerKeepingContents, BinsArray, printbins
 from prtpy.partitioning.karmarkar_karp import kk
-import numpy as np, logging
+import logging
 from prtpy import partition
 from prtpy.partitioning.complete_karmarkar_karp import optimal as ckk_optimal, generator as ckk_generator
-from prtpy.inclusion_exclusion_tree import InExclusionBinTree
+from prtpy.inclusion_exclusion_tree import InExclusionBinTree, combined_difference
 
 logger = logging.getLogger(__name__)
 
-def find_diff(l1: List, l2: List):
-    from collections import Counter
-    c1 = Counter(l1)
-    c2 = Counter(l2)
-    diff = c1 - c2
-    return list(diff.elements())
-
-
 # works only for 3, 4, 5 ways partitioning (as present in the paper)
 def rnp(binner: Binner, numbins: int, items: List[any]) -> BinsArray:
     """
@@ -72,6 +64,11 @@ def rnp(binner: Binner, numbins: int, items: List[any]) -> BinsArray:
     >>> sorted(rnp(BinnerKeepingContents(), 5, items=[3, 16, 22, 24, 24, 29])[0])
     [19.0, 22.0, 24.0, 24.0, 29.0]
 
+    The best top-level split need not be the most balanced one:
+    >>> sums = rnp(BinnerKeepingContents(), 4, [6.79, 3.29, 3.58, 4.03, 5.27, 5.71, 8.75, 4.02])[0]
+    >>> round(max(sums) - min(sums), 2)
+    2.23
+
     >>> from prtpy import partition
     >>> partition(algorithm=rnp, numbins=4, items={"a":1, "b":1, "c":1, "d":1})
     [['c'], ['d'], ['b'], ['a']]
@@ -80,7 +77,7 @@ def rnp(binner: Binner, numbins: int, items: List[any]) -> BinsArray:
     """
     best_partition_so_far = kk(binner=binner, numbins=numbins, items=items)
     sums = binner.sums(best_partition_so_far)
-    best_difference_so_far = max(sums) - min(sums)
+    best_difference_so_far = sums[-1] - sums[0]   # kk returns the bins sorted by ascending sum
     if best_difference_so_far == 0:  
         return best_partition_so_far     # 0 is the best possible value
 
@@ -113,33 +110,37 @@ def rec_generate_sets(prior_bins: BinsArray, best_partition_so_far: BinsArray, i
         )
         trees.append((in_ex_tree, t, current_numbins))
 
-        for items_for_last_bin in in_ex_tree.generate_tree():
+        for items_for_last_bin, remaining_items in in_ex_tree.generate_tree_with_remaining():
             prior_bins = binner.add_empty_bins(prior_bins, 1)
             for item in items_for_last_bin:
                 binner.add_item_to_bin(prior_bins, item=item, bin_index=num_prior_bins)
-            remaining_items = find_diff(items, items_for_last_bin)
             new_bins = rec_generate_sets(prior_bins, best_partition_so_far, remaining_items, total_numbins, current_numbins - 1, trees, binner)
-            # if new_bins:
-            bins_sums = binner.sums(best_partition_so_far)
-            best_difference_so_far = max(bins_sums) - min(bins_sums)
-            combined_sums = np.append(binner.sums(new_bins), binner.sums(prior_bins))
-            diff = max(combined_sums) - min(combined_sums)
+            diff = combined_difference(binner.sums(new_bins), binner.sums(prior_bins))
             if diff < best_difference_so_far:
                 best_partition_so_far = binner.concatenate_bins(prior_bins, new_bins)
+                best_difference_so_far = diff
             prior_bins = binner.remove_bins(prior_bins, 1)
+        trees.pop()   # keep only the trees that are still being iterated
     
     #### Even case: numbins is odd
     else:
         ckk_binner = BinnerKeepingContents(binner.valueof)
-        for top_level_part in ckk_generator(binner=ckk_binner, numbins=2, items=items, best_difference_so_far=-best_difference_so_far):
+        # Each half holds current_numbins/2 bins, so the halves of a better partition may differ by up to current_numbins/2 times the best difference.
+        top_level_parts = ckk_generator(binner=ckk_binner, numbins=2, items=items, best_difference_so_far=-(current_numbins/2)*best_difference_so_far)
+        top_level_part = next(top_level_parts, None)
+        while top_level_part is not None:
             bin1items, bin2items = top_level_part[1]
             new_bin1 = rec_generate_sets(prior_bins, best_partition_so_far, bin1items, total_numbins, current_numbins/2, trees, binner)
             new_bin2 = rec_generate_sets(prior_bins, best_partition_so_far, bin2items, total_numbins, current_numbins/2, trees, binner)
 
-            combined_sums = np.append(binner.sums(new_bin1), binner.sums(new_bin2))
-            diff = max(combined_sums) - min(combined_sums)
+            diff = combined_difference(binner.sums(new_bin1), binner.sums(new_bin2))
             if diff < best_difference_so_far:
                 best_partition_so_far = binner.concatenate_bins(new_bin1, new_bin2)
+                best_difference_so_far = diff
+            try:   # the next top-level part is searched with the tightened bound.
+                top_level_part = top_level_parts.send(-(current_numbins/2)*best_difference_so_far)
+            except StopIteration:
+                top_level_part = None
 
     return best_partition_so_far
 
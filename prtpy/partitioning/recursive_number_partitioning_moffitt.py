@@ -15,13 +15,17 @@ import math
 import random
 import time
 from numbers import Number
-from typing import List
+from typing import List, Sequence, Tuple
 from prtpy import partition, Binner, BinnerKeepingContents, BinsArray, printbins
 from prtpy.partitioning.greedy import greedy
+from prtpy.partitioning.karmarkar_karp import kk
 import logging
 
 logger = logging.getLogger(__name__)
 
+# the maximum number of sub-problems whose lower bound is kept during a single rnp call.
+_MAX_MEMO_SIZE = 100000
+
 
 def rnp(binner: Binner, numbins: int, items: List[any]) -> BinsArray:
     """
@@ -67,15 +71,29 @@ def rnp(binner: Binner, numbins: int, items: List[any]) -> BinsArray:
             binner.add_item_to_bin(all_in_first_bin, item, 0)
         return all_in_first_bin
 
-    # initial partition
-    initial_partition = greedy(binner, numbins, items)
+    # initial partition: the better of greedy and Karmarkar-Karp (on ties, greedy).
+    initial_partition = min(greedy(binner, numbins, items), kk(binner, numbins, items),
+                            key=lambda bins: max(binner.sums(bins)))
+
+    # the values are computed once and the items sorted by them; the recursion works on indices into these tuples.
+    valued_items = sorted(((binner.valueof(item), item) for item in items), key=lambda pair: pair[0], reverse=True)
+    values = tuple(value for value, _ in valued_items)
+    sorted_items = tuple(item for _, item in valued_items)
+
+    # no partition has a maximum sum below the lower bound; with integer values, the maximum sum is an integer too.
+    total_sum = sum(values)
+    lower_bound = max((values[0], total_sum / numbins))
+    if all(float(value).is_integer() for value in values):
+        lower_bound = math.ceil(lower_bound)
+    best_sum = max(binner.sums(initial_partition))
+    if best_sum <= lower_bound:
+        return initial_partition
 
     # call the recursive function to calculate the best partitions
-    _, _, best_partition = _rnp_recursive(binner.new_bins(numbins), binner,
-                                          sorted(items, key=binner.valueof, reverse=True), 0,
-                                          max((max(map(binner.valueof, items)),
-                                               math.ceil(sum(map(binner.valueof, items)) / numbins))),
-                                          max(binner.sums(initial_partition)), initial_partition)
+    _, _, best_partition = _rnp_recursive([], numbins, binner, sorted_items, values,
+                                          list(range(len(sorted_items))), total_sum, 0,
+                                          max((values[0], math.ceil(total_sum / numbins))), 0,
+                                          best_sum, initial_partition, {}, lower_bound)
     return best_partition
 
 
@@ -90,99 +108,136 @@ def _all_sub_groups(items):
     >>> sorted(list(_all_sub_groups(['a', 7])))
     [(['a'], [7]), (['a', 7], [])]
     """
-    for binary_partition_number in range(2 ** (len(items) - 1) - 1, -1, -1):
-        binary_partition = f'{binary_partition_number:0{len(items) - 1}b}'
-
+    other_items = items[1:]
+    # the most significant bit of the binary partition number corresponds to items[1], as in its binary representation.
+    bits = [1 << (len(other_items) - 1 - index) for index in range(len(other_items))]
+    for binary_partition_number in range(2 ** len(other_items) - 1, -1, -1):
         # add items to the current group based on the binary partition
-        current_group = [items[0]] + [item for label, item in zip(binary_partition, items[1:]) if label == '1']
-        rest_of_items = [item for label, item in zip(binary_partition, items[1:]) if label == '0']
+        current_group = [items[0]]
+        rest_of_items = []
+        for bit, item in zip(bits, other_items):
+            if binary_partition_number & bit:
+                current_group.append(item)
+            else:
+                rest_of_items.append(item)
 
         yield current_group, rest_of_items
 
 
-def _handel_group(current_group, rest_of_items, best_sum, best_partition, binner, bins, current_bin, min_sum):
-    # pruning
-    current_group_sum = sum(map(binner.valueof, current_group))
-    rest_of_items_sum = sum(map(binner.valueof, rest_of_items))
+def _handel_group(current_group, rest_of_items, remaining_sum, best_sum, best_partition, binner, groups, numbins,
+                  items, values, current_bin, min_sum, max_sum, memo, lower_bound):
+    # pruning; the groups hold indices into items and values.
+    # The indices are ascending and the values descending, so the last item in the rest has the smallest value:
+    # some item of the rest fits in the current bin up to min_sum iff that one does.
+    current_group_sum = sum(values[index] for index in current_group)
+    rest_of_items_sum = remaining_sum - current_group_sum
     if current_group_sum >= best_sum or \
-            rest_of_items_sum >= best_sum * (binner.numbins(bins) - current_bin - 1) or \
-            any([current_group_sum + binner.valueof(item) <= min_sum for item in rest_of_items]):
+            rest_of_items_sum >= best_sum * (numbins - current_bin - 1) or \
+            (len(rest_of_items) > 0 and current_group_sum + values[rest_of_items[-1]] <= min_sum):
         return None
 
-    # add items to the current group based on the binary partition
-    bins_copy = binner.copy_bins(bins)
-    for item in current_group:
-        binner.add_item_to_bin(bins_copy, item, current_bin)
+    # put the current group in the current bin, and take it out again once the rest of the items are partitioned
+    groups.append(current_group)
+    resulting_sum, best_sum, best_partition = _rnp_recursive(groups, numbins, binner, items, values, rest_of_items,
+                                                             rest_of_items_sum, current_bin + 1,
+                                                             max((current_group_sum, min_sum)),
+                                                             max((current_group_sum, max_sum)),
+                                                             best_sum, best_partition, memo, lower_bound)
+    groups.pop()
 
-    # partition the rest of the items to the rst of the bins
-    resulting_partition, best_sum, best_partition = _rnp_recursive(bins_copy, binner, rest_of_items,
-                                                                   current_bin + 1,
-                                                                   max((current_group_sum, min_sum)), best_sum,
-                                                                   best_partition)
+    # if current partition is better or equal optimistic bound, return it immediately
+    if resulting_sum is not None and resulting_sum <= min_sum:
+        return resulting_sum, best_sum, best_partition, True
 
-    # update, if needed, the best partition and best sum so far
-    if resulting_partition is not None:
-        current_sum = max(binner.sums(resulting_partition))
-        if current_sum < best_sum:
-            best_sum = current_sum
-            best_partition = binner.copy_bins(resulting_partition)
+    return resulting_sum, best_sum, best_partition, False
 
-        # if current partition is better or equal optimistic bound, return it immediately
-        if current_sum <= min_sum:
-            return resulting_partition, best_sum, best_partition, True
 
-    return resulting_partition, best_sum, best_partition, False
+def _bins_from_groups(binner: Binner, numbins: int, items: Sequence[any], groups: List[List[int]]) -> BinsArray:
+    """
+    Build the bins whose items are given, bin by bin, as groups of indices into items.
+
+    >>> printbins(_bins_from_groups(BinnerKeepingContents(), 3, [5, 4, 3], [[0, 2], [1]]))
+    Bin #0: [5, 3], sum=8.0
+    Bin #1: [4], sum=4.0
+    Bin #2: [], sum=0.0
+    """
+    bins = binner.new_bins(numbins)
+    for ibin, group in enumerate(groups):
+        for index in group:
+            binner.add_item_to_bin(bins, items[index], ibin)
+    return bins
 
 
-def _rnp_recursive(bins: BinsArray, binner: Binner, items: List[any], current_bin: int, min_sum: Number,
-                   best_sum: Number, best_partition: BinsArray) -> (BinsArray, Number, BinsArray):
+def _rnp_recursive(groups: List[List[int]], numbins: int, binner: Binner, items: Tuple[any], values: Tuple[Number],
+                   indices: List[int], remaining_sum: Number, current_bin: int, min_sum: Number, max_sum: Number,
+                   best_sum: Number, best_partition: BinsArray, memo: dict,
+                   lower_bound: Number) -> (Number, Number, BinsArray):
     """
     The main recursive function for rnp. uses some help arguments.
+    items are all the items, sorted by descending value, and values are their values;
+    groups holds the indices of the items in each bin before current_bin,
+    indices are the positions of the items that are not in any bin yet, and remaining_sum is the sum of their values.
+    max_sum is the maximum sum of the bins before current_bin.
+    The bins are only built when a better partition is found.
+    memo maps the remaining values and number of bins to a lower bound on the maximum sum of their partitions.
+    lower_bound is a lower bound on the maximum sum of any partition of all the items: once best_sum reaches it,
+    the search stops.
     The third value returned is the best partition of the items.
     The second is the maximum sum in the best partition.
-    The first value returned is a temporary value for the recursive calculations.
+    The first value returned is a temporary value for the recursive calculations:
+    the maximum sum of the last partition found, or None if none was found.
     """
 
-    logger.info(f'rnp recursive call with {bins=}, {items=}, {current_bin=}')
-    logger.debug(f'{best_sum=}, {min_sum=}, {best_sum=}, {best_partition=}')
+    logger.info("rnp recursive call with groups=%s, indices=%s, current_bin=%d", groups, indices, current_bin)
+    logger.debug("best_sum=%s, min_sum=%s, max_sum=%s, best_partition=%s", best_sum, min_sum, max_sum, best_partition)
 
     # last bin
-    if current_bin == binner.numbins(bins) - 1:
-        for item in items:
-            binner.add_item_to_bin(bins, item, current_bin)
-        current_sum = max(binner.sums(bins))
+    if current_bin == numbins - 1:
+        current_sum = max((max_sum, sum(values[index] for index in indices)))
         if current_sum < best_sum:
             best_sum = current_sum
-            best_partition = binner.copy_bins(bins)
-        return bins, best_sum, best_partition
+            best_partition = _bins_from_groups(binner, numbins, items, groups + [indices])
+        return current_sum, best_sum, best_partition
 
     # only one item
-    if len(items) == 1:
-        binner.add_item_to_bin(bins, *items, current_bin)
-        current_sum = max(binner.sums(bins))
+    if len(indices) == 1:
+        current_sum = max((max_sum, values[indices[0]]))
         if current_sum < best_sum:
             best_sum = current_sum
-            best_partition = binner.copy_bins(bins)
-        return bins, best_sum, best_partition
+            best_partition = _bins_from_groups(binner, numbins, items, groups + [indices])
+        return current_sum, best_sum, best_partition
 
     # empty bins array or no more items
-    if current_bin == binner.numbins(bins) or len(items) == 0:
-        return bins, best_sum, best_partition
+    if current_bin == numbins or len(indices) == 0:
+        if max_sum < best_sum:
+            best_sum = max_sum
+            best_partition = _bins_from_groups(binner, numbins, items, groups)
+        return max_sum, best_sum, best_partition
+
+    # equal values in different positions lead to the same sub-problem; skip it if it cannot beat best_sum.
+    memo_key = (tuple(values[index] for index in indices), numbins - current_bin)
+    if memo.get(memo_key, -math.inf) >= best_sum:
+        return None, best_sum, best_partition
 
-    resulting_partition = None
+    resulting_sum = None
 
     # iterate all options of what numbers to put in the current group
-    for current_group, rest_of_items in _all_sub_groups(items):
-        group_result = _handel_group(current_group, rest_of_items, best_sum, best_partition, binner, bins, current_bin, min_sum)
+    for current_group, rest_of_items in _all_sub_groups(indices):
+        group_result = _handel_group(current_group, rest_of_items, remaining_sum, best_sum, best_partition, binner,
+                                     groups, numbins, items, values, current_bin, min_sum, max_sum, memo,
+                                     lower_bound)
         if group_result is None:
             continue
-        resulting_partition, best_sum, best_partition, finish = group_result
-        if finish:
+        resulting_sum, best_sum, best_partition, finish = group_result
+        if finish or best_sum <= lower_bound:
             break
 
+    # the search found no partition whose maximum sum is below best_sum, so neither does any partition of these values.
+    if max_sum < best_sum and (memo_key in memo or len(memo) < _MAX_MEMO_SIZE):
+        memo[memo_key] = max((memo.get(memo_key, -math.inf), best_sum))
 
-    # return the found partition
-    return resulting_partition, best_sum, best_partition
+    # return the maximum sum of the found partition
+    return resulting_sum, best_sum, best_partition
 
 
 if __name__ == '__main__':
@@ -30,11 +30,10 @@ def roundrobin(binner: Binner, numbins: int, items: List[any]):
     >>> partition(algorithm=roundrobin, numbins=2, items={"a":1, "b":2, "c":3, "d":3, "e":5, "f":9, "g":9}, outputtype=out.Sums)
     [18.0, 14.0]
     """
-    ibin = 0
     bins = binner.new_bins(numbins)
-    for item in sorted(items, key=binner.valueof, reverse=True):
-        binner.add_item_to_bin(bins, item, ibin)
-        ibin = (ibin+1) % numbins
+    sorted_items = sorted(items, key=binner.valueof, reverse=True)
+    for ibin in range(numbins):   # bin i gets the items in positions i, i+numbins, i+2*numbins, ...
+        binner.add_items_to_bin(bins, sorted_items[ibin::numbins], ibin)
     return bins
 
 
@@ -21,18 +21,11 @@ from typing import Callable, List
 from prtpy import outputtypes as out, objectives as obj, Binner, BinsArray, printbins
 from prtpy.partitioning.karmarkar_karp import kk
 from prtpy.partitioning.complete_karmarkar_karp import optimal as ckk_optimal
-import numpy as np, logging
+import logging
 from prtpy import partition
-from prtpy.inclusion_exclusion_tree import InExclusionBinTree
+from prtpy.inclusion_exclusion_tree import InExclusionBinTree, combined_difference
 
 
-def find_diff(l1: List, l2: List):
-    from collections import Counter
-    c1 = Counter(l1)
-    c2 = Counter(l2)
-    diff = c1 - c2
-    return list(diff.elements())
-
 logger = logging.getLogger(__name__)
 
 def snp(binner: Binner, numbins: int, items: List[any]) -> BinsArray:
@@ -83,7 +76,7 @@ def snp(binner: Binner, numbins: int, items: List[any]) -> BinsArray:
     """
     best_partition_so_far = kk(binner=binner, numbins=numbins, items=items)
     sums = binner.sums(best_partition_so_far)
-    best_difference_so_far = max(sums) - min(sums)
+    best_difference_so_far = sums[-1] - sums[0]   # kk returns the bins sorted by ascending sum
     if best_difference_so_far == 0:  
         return best_partition_so_far     # 0 is the best possible value
 
@@ -92,9 +85,10 @@ def snp(binner: Binner, numbins: int, items: List[any]) -> BinsArray:
     return best_partition_so_far
 
 
-def rec_generate_sets(prior_bins: BinsArray, best_partition_so_far: BinsArray, items: List, total_numbins:int, current_numbins:int, trees: List, binner: Binner):
+def rec_generate_sets(prior_bins: BinsArray, best_partition_so_far: BinsArray, items: List, total_numbins:int, current_numbins:int, trees: List, binner: Binner, items_sum: float = None):
     """
     A recursive subroutine of SNP.
+    items_sum is the sum of the values of the items; it is computed if not given.
     """
     logger.info("Recursive call: best_partition_so_far=%s, prior_bins=%s, items=%s, numbins=%d", best_partition_so_far, prior_bins, items, current_numbins)
     num_prior_bins = total_numbins - current_numbins
@@ -103,35 +97,35 @@ def rec_generate_sets(prior_bins: BinsArray, best_partition_so_far: BinsArray, i
     if current_numbins == 2:   # Run two-way CKK on the remaining items.
         two_bins = ckk_optimal(binner=binner, numbins=2, items=items)
         logger.info("  CKK result: %s", two_bins)
-        combined_sums = np.append(binner.sums(two_bins), binner.sums(prior_bins))
-        diff = max(combined_sums) - min(combined_sums)
+        diff = combined_difference(binner.sums(two_bins), binner.sums(prior_bins))
 
         # Better partition found - update best_partition_so_far
         if diff < best_difference_so_far:
             best_partition_so_far = binner.concatenate_bins(two_bins, prior_bins)
             logger.info("  Combined with prior: %s", best_partition_so_far)
 
-            # update lower bounds
+            # update lower bounds of the trees that are still being iterated (one per level above)
             for tree in trees:
                 tree[0].lower_bound = (tree[1] - (tree[2] - 1) * diff) / tree[2]
 
         return best_partition_so_far
 
     # Here, numbins >= 3.
-    t = sum(map(binner.valueof, items))  # t is the sum of all the remaining items
+    t = sum(map(binner.valueof, items)) if items_sum is None else items_sum  # t is the sum of all the remaining items
     in_ex_tree = InExclusionBinTree(items=items, valueof=binner.valueof,
         lower_bound=(t - (current_numbins - 1) * best_difference_so_far) / current_numbins, 
         upper_bound=t / current_numbins
     )
     trees.append((in_ex_tree, t, current_numbins))
 
-    for items_for_last_bin in in_ex_tree.generate_tree():
+    for items_for_last_bin, remaining_items in in_ex_tree.generate_tree_with_remaining():
         prior_bins = binner.add_empty_bins(prior_bins, 1)
         for item in items_for_last_bin:
             binner.add_item_to_bin(prior_bins, item=item, bin_index=num_prior_bins)
-        remaining_items = find_diff(items, items_for_last_bin)
-        best_partition_so_far = rec_generate_sets(prior_bins, best_partition_so_far, remaining_items, total_numbins, current_numbins-1, trees, binner)
+        remaining_sum = t - binner.sums(prior_bins)[num_prior_bins]
+        best_partition_so_far = rec_generate_sets(prior_bins, best_partition_so_far, remaining_items, total_numbins, current_numbins-1, trees, binner, remaining_sum)
         prior_bins = binner.remove_bins(prior_bins, 1)
+    trees.pop()   # this tree is exhausted, so its bound no longer needs updating
 
     return best_partition_so_far
 
@@ -0,0 +1,70 @@
+"""
+Regression tests for the ILP partitioning algorithms on inputs of the size used in examples/partitioning_algorithms.py:
+100 items with small values (many duplicates) into 4 bins.
+
+Merging equal-valued items into one general-integer row, or using continuous slack variables in the
+distance-from-average ILP, made the solver much slower on such inputs; so the tests check the structure of the model.
+"""
+
+import os, re, tempfile, unittest
+
+import numpy as np
+
+import prtpy
+from prtpy.partitioning.integer_programming import optimal, count_name
+from prtpy.partitioning.integer_programming_avg import optimal as optimal_avg
+
+NUMITEMS = 100
+NUMBINS = 4
+
+
+def random_values(seed: int):
+    np.random.seed(seed)
+    return np.random.randint(1, 10, NUMITEMS)
+
+
+def read_model(algorithm, values, **kwargs) -> str:
+    """
+    Return the text of the model file that the algorithm writes for the given values.
+    The model is written before it is solved, so the solver is stopped early; its result does not matter here.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        model_filename = os.path.join(directory, "model.lp")
+        try:
+            prtpy.partition(algorithm=algorithm, numbins=NUMBINS, items=values, model_filename=model_filename, time_limit=1, **kwargs)
+        except ValueError:   # not solved to optimality within the time limit.
+            pass
+        with open(model_filename) as model_file:
+            return model_file.read()
+
+
+class TestIntegerProgramming(unittest.TestCase):
+    def check_model(self, algorithm, **kwargs):
+        model = read_model(algorithm, random_values(0), **kwargs)
+        # Each item has its own row of count variables, each of which is 0 or 1:
+        expected_counts = {count_name(iitem, ibin) for iitem in range(NUMITEMS) for ibin in range(NUMBINS)}
+        assert set(re.findall(r"\bitem\d+_in_bin\d+\b", model)) == expected_counts
+        assert set(re.findall(r"0 <= (item\d+_in_bin\d+) <= 1\b", model)) == expected_counts
+        # All variables (including the auxiliary ones) are integer:
+        all_variables = set(re.findall(r"\bitem\d+_in_bin\d+\b|\bvar\(\d+\)", model))
+        integer_variables = set(model.split("Integers")[1].split("End")[0].split())
+        assert all_variables == integer_variables
+
+    def check_optimal(self, algorithm, **kwargs):
+        for seed in range(3):
+            values = random_values(seed)
+            sums = prtpy.partition(algorithm=algorithm, numbins=NUMBINS, items=values, outputtype=prtpy.out.Sums, **kwargs)
+            assert sum(sums) == sum(values)
+            assert max(sums) == np.ceil(sum(values) / NUMBINS), f"seed {seed}: sums {sums}"   # with so many small items, both objectives balance the sums.
+
+    def test_minimize_largest_sum(self):
+        self.check_model(optimal, objective=prtpy.obj.MinimizeLargestSum)
+        self.check_optimal(optimal, objective=prtpy.obj.MinimizeLargestSum)
+
+    def test_minimize_dist_avg(self):
+        self.check_model(optimal_avg)
+        self.check_optimal(optimal_avg)
+
+
+if __name__ == "__main__":
+    unittest.main()